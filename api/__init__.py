@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from api import integrations
+from api import integrations, profiling
 
 
 router: APIRouter = APIRouter()
@@ -10,6 +10,10 @@ router.include_router(
     integrations.router,
     tags=["integrations"],
 )
+router.include_router(
+    profiling.router,
+    tags=["profiling"],
+)
 
 
 __all__ = ["router"]
@@ -1,7 +1,15 @@
-from fastapi import APIRouter, Form, Request
+from datetime import datetime
 
-from database.enum import IntegrationTypeEnum
+from fastapi import APIRouter, Form, Request, Response
+from fastapi.responses import StreamingResponse
+
+from core.config import settings
+from database.enum import ExportFormatEnum, IntegrationTypeEnum
+from schemas.item_filter import ItemFilter
 from services.integrations import integration_processors
+from services.integrations.loading import load_items, resolve_credentials
+from utils.deadlines import iter_within_deadline, request_budget, run_with_deadline
+from utils.export import export_media_type, stream_export
 from utils.integrations import IntegrationProcessor
 
 
@@ -35,6 +43,76 @@ async def get_airtable_credentials_integration(
 
 
 @router.post("/integrations/airtable/load")
-async def get_airtable_items(credentials: str = Form(...)):
+async def get_airtable_items(
+    request: Request,
+    response: Response,
+    credentials: str | None = Form(None),
+    user_id: str | None = Form(None),
+    org_id: str | None = Form(None),
+    delta: bool = Form(False),
+    root_hash: str | None = Form(None),
+    subtree_hashes: str | None = Form(None),
+    refresh: bool = Form(False),
+    item_type: str | None = Form(None),
+    parent_id: str | None = Form(None),
+    modified_since: datetime | None = Form(None),
+    name_prefix: str | None = Form(None),
+):
+    if integration_processor:
+        return await run_with_deadline(
+            request,
+            IntegrationTypeEnum.AIRTABLE,
+            load_items(
+                integration_processor,
+                IntegrationTypeEnum.AIRTABLE,
+                credentials,
+                response,
+                org_id=org_id,
+                user_id=user_id,
+                delta=delta,
+                root_hash=root_hash,
+                subtree_hashes=subtree_hashes,
+                refresh=refresh,
+                item_filter=ItemFilter(
+                    item_type, parent_id, modified_since, name_prefix
+                ),
+            ),
+        )
+
+
+@router.post("/integrations/airtable/export")
+async def export_airtable_items(
+    request: Request,
+    credentials: str | None = Form(None),
+    user_id: str | None = Form(None),
+    org_id: str | None = Form(None),
+    export_format: ExportFormatEnum = Form(ExportFormatEnum.ARROW),
+    item_type: str | None = Form(None),
+    parent_id: str | None = Form(None),
+    modified_since: datetime | None = Form(None),
+    name_prefix: str | None = Form(None),
+):
     if integration_processor:
-        return await integration_processor.get_items(credentials)
+        budget = request_budget(request, settings.EXPORT_TIMEOUT)
+        credentials = await resolve_credentials(
+            integration_processor,
+            IntegrationTypeEnum.AIRTABLE,
+            credentials,
+            org_id,
+            user_id,
+        )
+        return StreamingResponse(
+            stream_export(
+                IntegrationTypeEnum.AIRTABLE,
+                iter_within_deadline(
+                    IntegrationTypeEnum.AIRTABLE,
+                    integration_processor.iter_items(
+                        credentials,
+                        ItemFilter(item_type, parent_id, modified_since, name_prefix),
+                    ),
+                    budget,
+                ),
+                export_format,
+            ),
+            media_type=export_media_type(export_format),
+        )
@@ -1,9 +1,17 @@
-from fastapi import APIRouter, Form, Request
+from datetime import datetime
+
+from fastapi import APIRouter, Form, Request, Response
+from fastapi.responses import StreamingResponse
 
 from api import integrations
 
-from database.enum import IntegrationTypeEnum
+from core.config import settings
+from database.enum import ExportFormatEnum, IntegrationTypeEnum
+from schemas.item_filter import ItemFilter
 from services.integrations import integration_processors
+from services.integrations.loading import load_items, resolve_credentials
+from utils.deadlines import iter_within_deadline, request_budget, run_with_deadline
+from utils.export import export_media_type, stream_export
 from utils.integrations import IntegrationProcessor
 
 
@@ -38,6 +46,76 @@ async def get_hubspot_credentials_integration(
 
 
 @router.post("/integrations/hubspot/load")
-async def load_slack_data_integration(credentials: str = Form(...)):
+async def load_slack_data_integration(
+    request: Request,
+    response: Response,
+    credentials: str | None = Form(None),
+    user_id: str | None = Form(None),
+    org_id: str | None = Form(None),
+    delta: bool = Form(False),
+    root_hash: str | None = Form(None),
+    subtree_hashes: str | None = Form(None),
+    refresh: bool = Form(False),
+    item_type: str | None = Form(None),
+    parent_id: str | None = Form(None),
+    modified_since: datetime | None = Form(None),
+    name_prefix: str | None = Form(None),
+):
+    if integration_processor:
+        return await run_with_deadline(
+            request,
+            IntegrationTypeEnum.HUBSPOT,
+            load_items(
+                integration_processor,
+                IntegrationTypeEnum.HUBSPOT,
+                credentials,
+                response,
+                org_id=org_id,
+                user_id=user_id,
+                delta=delta,
+                root_hash=root_hash,
+                subtree_hashes=subtree_hashes,
+                refresh=refresh,
+                item_filter=ItemFilter(
+                    item_type, parent_id, modified_since, name_prefix
+                ),
+            ),
+        )
+
+
+@router.post("/integrations/hubspot/export")
+async def export_hubspot_items(
+    request: Request,
+    credentials: str | None = Form(None),
+    user_id: str | None = Form(None),
+    org_id: str | None = Form(None),
+    export_format: ExportFormatEnum = Form(ExportFormatEnum.ARROW),
+    item_type: str | None = Form(None),
+    parent_id: str | None = Form(None),
+    modified_since: datetime | None = Form(None),
+    name_prefix: str | None = Form(None),
+):
     if integration_processor:
-        return await integration_processor.get_items(credentials)
+        budget = request_budget(request, settings.EXPORT_TIMEOUT)
+        credentials = await resolve_credentials(
+            integration_processor,
+            IntegrationTypeEnum.HUBSPOT,
+            credentials,
+            org_id,
+            user_id,
+        )
+        return StreamingResponse(
+            stream_export(
+                IntegrationTypeEnum.HUBSPOT,
+                iter_within_deadline(
+                    IntegrationTypeEnum.HUBSPOT,
+                    integration_processor.iter_items(
+                        credentials,
+                        ItemFilter(item_type, parent_id, modified_since, name_prefix),
+                    ),
+                    budget,
+                ),
+                export_format,
+            ),
+            media_type=export_media_type(export_format),
+        )
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse
+
+from utils.profiling import get_profile_path, is_profiling_authorized
+
+
+router: APIRouter = APIRouter()
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, request: Request):
+    if not is_profiling_authorized(request):
+        raise HTTPException(status_code=403, detail="Profiling is not allowed.")
+
+    path = get_profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+
+    return FileResponse(path, media_type="application/json")
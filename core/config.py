@@ -16,6 +16,18 @@ class EnvFlavour(StrEnum):
     prod = auto()
 
 
+class RedisMode(StrEnum):
+    standalone = auto()
+    cluster = auto()
+    sentinel = auto()
+
+
+class OffloadMode(StrEnum):
+    none = auto()
+    thread = auto()
+    process = auto()
+
+
 class GlobalConfig(BaseSettings):
     """Global configurations."""
 
@@ -30,6 +42,74 @@ class GlobalConfig(BaseSettings):
     HUBSPOT_CLIENT_ID: str
     HUBSPOT_CLIENT_SECRET: str
 
+    REDIS_MODE: RedisMode = Field(default=RedisMode.standalone)
+    REDIS_HOST: str = Field(default="localhost")
+    REDIS_PORT: int = Field(default=6379)
+    REDIS_DB: int = Field(default=0)
+    REDIS_PASSWORD: str | None = Field(default=None)
+    # Comma separated `host:port` pairs, only used in sentinel mode.
+    REDIS_SENTINELS: str = Field(default="")
+    REDIS_SENTINEL_MASTER: str = Field(default="mymaster")
+
+    PROFILING_ENABLED: bool = Field(default=False)
+    PROFILING_SAMPLE_RATE: float = Field(default=0.0, ge=0.0, le=1.0)
+    PROFILING_INTERVAL: float = Field(default=0.001)
+    PROFILING_OUTPUT_DIR: str = Field(default="profiles")
+    # Oldest profiles beyond the count, or older than the age in seconds, are
+    # deleted whenever a new profile is written.
+    PROFILING_MAX_FILES: int = Field(default=200, gt=0)
+    PROFILING_MAX_AGE: int = Field(default=86400, gt=0)
+    # Lets callers presenting `X-Profile-Token` profile requests in prod.
+    PROFILING_TOKEN: str | None = Field(default=None)
+
+    # How long a tenant's item snapshot can be diffed against, in seconds.
+    SNAPSHOT_TTL: int = Field(default=86400)
+
+    # Upper bound on rows held in memory per Arrow record batch when exporting.
+    EXPORT_BATCH_SIZE: int = Field(default=10_000, gt=0)
+
+    # Response bodies above the threshold are decoded and mapped in a pool.
+    OFFLOAD_MODE: OffloadMode = Field(default=OffloadMode.none)
+    OFFLOAD_MAX_WORKERS: int | None = Field(default=None)
+    OFFLOAD_THRESHOLD_BYTES: int = Field(default=256 * 1024)
+
+    # Default request budgets in seconds; callers may ask for less (or more,
+    # up to MAX_REQUEST_TIMEOUT) with the `X-Request-Timeout` header.
+    LOAD_TIMEOUT: float = Field(default=60.0)
+    EXPORT_TIMEOUT: float = Field(default=900.0)
+    MAX_REQUEST_TIMEOUT: float = Field(default=900.0)
+    DISCONNECT_POLL_INTERVAL: float = Field(default=0.5)
+
+    ITEM_CACHE_TTL: int = Field(default=300)
+    # Concurrent post-OAuth warm-up crawls per worker, and their time limit.
+    PREFETCH_CONCURRENCY: int = Field(default=4, gt=0)
+    PREFETCH_TIMEOUT: float = Field(default=300.0)
+
+    # Comma separated Fernet keys; the first encrypts, all of them decrypt so
+    # keys can be rotated without losing stored credentials.
+    CREDENTIAL_VAULT_KEYS: str = Field(default="")
+    CREDENTIAL_CACHE_SIZE: int = Field(default=10_000)
+    CREDENTIAL_CACHE_TTL: int = Field(default=300)
+    # Access tokens expiring within this many seconds are refreshed before use.
+    CREDENTIAL_REFRESH_MARGIN: int = Field(default=120)
+
+    # Admission control for load routes, per worker. Org weights are JSON,
+    # e.g. `{"org-a": 3}`; orgs not listed have weight 1.
+    ADMISSION_MAX_CONCURRENCY: int = Field(default=64, gt=0)
+    ADMISSION_MAX_PER_ORG: int = Field(default=8, gt=0)
+    ADMISSION_MAX_QUEUE: int = Field(default=256, ge=0)
+    ADMISSION_ORG_WEIGHTS: dict[str, int] = Field(default_factory=dict)
+    # Loads without an org_id (e.g. posting a credentials blob) share one
+    # bucket with its own cap and weight instead of a single org's.
+    ADMISSION_MAX_UNATTRIBUTED: int = Field(default=32, gt=0)
+    ADMISSION_UNATTRIBUTED_WEIGHT: int = Field(default=4, gt=0)
+
+    # Opt-in event loop lag monitor; stalls longer than the threshold are
+    # logged with the loop thread's stack.
+    LOOP_MONITOR_ENABLED: bool = Field(default=False)
+    LOOP_MONITOR_INTERVAL: float = Field(default=0.05, gt=0)
+    LOOP_MONITOR_THRESHOLD: float = Field(default=0.1, gt=0)
+
 
 class DevConfig(GlobalConfig):
     """Development configurations."""
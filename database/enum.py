@@ -5,3 +5,8 @@ class IntegrationTypeEnum(Enum):
     AIRTABLE = "Airtable"
     HUBSPOT = "Hubspot"
     NOTION = "Notion"
+
+
+class ExportFormatEnum(Enum):
+    ARROW = "arrow"
+    PARQUET = "parquet"
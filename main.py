@@ -1,6 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import make_asgi_app
 from api import router
+from core.config import settings
+from utils.credential_vault import check_vault_keys
+from utils.loop_monitor import LoopMonitorMiddleware, loop_monitor
+from utils.offload import shutdown_executor
+from utils.profiling import ProfilingMiddleware
 
 app = FastAPI()
 
@@ -16,7 +22,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+if settings.LOOP_MONITOR_ENABLED:
+    app.add_middleware(LoopMonitorMiddleware)
+
 app.include_router(router)
+app.mount("/metrics", make_asgi_app())
+
+
+@app.on_event("startup")
+def check_credential_vault_keys():
+    check_vault_keys()
+
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+
+
+@app.on_event("shutdown")
+def shutdown_offload_executor():
+    shutdown_executor()
+
+
+@app.on_event("shutdown")
+def stop_loop_monitor():
+    loop_monitor.stop()
 
 
 @app.get("/")
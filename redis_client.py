@@ -1,20 +1,112 @@
-import os
+import asyncio
+
 import redis.asyncio as redis
+from redis.asyncio.cluster import RedisCluster
+from redis.asyncio.sentinel import Sentinel
 from kombu.utils.url import safequote
 
-redis_host = safequote(os.environ.get("REDIS_HOST", "localhost"))
-redis_client = redis.Redis(host=redis_host, port=6379, db=0)
+from core.config import RedisMode, settings
+from utils.deadlines import remaining
+
+
+def _parse_sentinels(sentinels: str) -> list[tuple[str, int]]:
+    """Parses `host:port` pairs, defaulting to the standard sentinel port."""
+    nodes = []
+    for node in sentinels.split(","):
+        if not node.strip():
+            continue
+        host, _, port = node.strip().partition(":")
+        nodes.append((safequote(host), int(port or 26379)))
+    return nodes
+
+
+def _create_redis_client() -> redis.Redis | RedisCluster:
+    """Builds the client for the topology selected by `REDIS_MODE`."""
+    redis_host = safequote(settings.REDIS_HOST)
+
+    if settings.REDIS_MODE == RedisMode.cluster:
+        return RedisCluster(
+            host=redis_host,
+            port=settings.REDIS_PORT,
+            password=settings.REDIS_PASSWORD,
+        )
+
+    if settings.REDIS_MODE == RedisMode.sentinel:
+        sentinel = Sentinel(
+            _parse_sentinels(settings.REDIS_SENTINELS),
+            password=settings.REDIS_PASSWORD,
+            db=settings.REDIS_DB,
+        )
+        return sentinel.master_for(settings.REDIS_SENTINEL_MASTER)
+
+    return redis.Redis(
+        host=redis_host,
+        port=settings.REDIS_PORT,
+        db=settings.REDIS_DB,
+        password=settings.REDIS_PASSWORD,
+    )
+
+
+redis_client = _create_redis_client()
+
+
+def tenant_key(namespace: str, org_id: str, user_id: str) -> str:
+    """Builds a key hash-tagged with `{org_id:user_id}`.
+
+    Redis Cluster only hashes the part between braces, so every key of a
+    tenant lands on the same slot and can be used in one pipeline.
+    """
+    return f"{namespace}:{{{org_id}:{user_id}}}"
+
+
+def pipeline():
+    """Returns a pipeline, wrapped in MULTI/EXEC where the topology allows it.
+
+    Cluster pipelines cannot run transactions, but keys sharing a hash tag
+    are still sent to a single node in one round trip.
+    """
+    return redis_client.pipeline(transaction=settings.REDIS_MODE != RedisMode.cluster)
+
+
+def _within_deadline(awaitable):
+    """Bounds a Redis call by the deadline of the request being served."""
+    return asyncio.wait_for(awaitable, timeout=remaining())
+
+
+def lock_redis(key, timeout):
+    """Distributed lock that expires after `timeout` seconds if never released.
+
+    Waiting for it is bounded by the deadline of the request being served.
+    """
+    return redis_client.lock(key, timeout=timeout, blocking_timeout=remaining())
 
 
 async def add_key_value_redis(key, value, expire=None):
-    await redis_client.set(key, value)
-    if expire:
-        await redis_client.expire(key, expire)
+    await _within_deadline(redis_client.set(key, value, ex=expire))
+
+
+async def add_key_values_redis(mapping: dict, expire=None):
+    async with pipeline() as pipe:
+        for key, value in mapping.items():
+            pipe.set(key, value, ex=expire)
+        await _within_deadline(pipe.execute())
 
 
 async def get_value_redis(key):
-    return await redis_client.get(key)
+    return await _within_deadline(redis_client.get(key))
+
+
+async def get_values_redis(*keys):
+    return await _within_deadline(redis_client.mget(keys))
+
+
+async def expire_key_redis(key, expire):
+    await _within_deadline(redis_client.expire(key, expire))
 
 
 async def delete_key_redis(key):
-    await redis_client.delete(key)
+    await _within_deadline(redis_client.delete(key))
+
+
+async def delete_keys_redis(*keys):
+    await _within_deadline(redis_client.delete(*keys))
@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from schemas.integration_item import IntegrationItem
+
+
+def _as_utc(value: datetime | str) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class ItemFilter:
+    """Filters of a load request.
+
+    Processors push as much of it as they can down to the provider's own
+    query API and apply `matches` to whatever comes back.
+    """
+
+    def __init__(
+        self,
+        type: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        modified_since: Optional[datetime] = None,
+        name_prefix: Optional[str] = None,
+    ):
+        self.type = type
+        self.parent_id = parent_id
+        self.modified_since = (
+            None if modified_since is None else _as_utc(modified_since)
+        )
+        self.name_prefix = name_prefix
+
+    def is_empty(self) -> bool:
+        return (
+            self.type is None
+            and self.parent_id is None
+            and self.modified_since is None
+            and self.name_prefix is None
+        )
+
+    def is_modified_since(self, last_modified_time: datetime | str | None) -> bool:
+        """Items without a modification time are kept, as they may have changed."""
+        if self.modified_since is None or last_modified_time is None:
+            return True
+        return _as_utc(last_modified_time) >= self.modified_since
+
+    def matches(self, item: IntegrationItem) -> bool:
+        if self.type is not None and (item.type or "").lower() != self.type.lower():
+            return False
+        if self.parent_id is not None and item.parent_id != self.parent_id:
+            return False
+        if not self.is_modified_since(item.last_modified_time):
+            return False
+        if self.name_prefix is not None and not self._name_matches(item):
+            return False
+        return True
+
+    def _name_matches(self, item: IntegrationItem) -> bool:
+        """Matches the name with or without its object type prefix.
+
+        Notion names items `"<object type> <title>"`, while callers filter
+        by title.
+        """
+        prefix = self.name_prefix.lower()
+        name = (item.name or "").lower()
+        if name.startswith(prefix):
+            return True
+        type_prefix = f"{(item.type or '').lower()} "
+        return type_prefix != " " and name.removeprefix(type_prefix).startswith(prefix)
@@ -9,13 +9,28 @@ import httpx
 import asyncio
 import base64
 import hashlib
+from typing import AsyncIterator
 
-import requests
 from core.config import settings
+from database.enum import IntegrationTypeEnum
 from schemas.integration_item import IntegrationItem
+from schemas.item_filter import ItemFilter
 
-from redis_client import add_key_value_redis, get_value_redis, delete_key_redis
+from redis_client import (
+    add_key_values_redis,
+    delete_keys_redis,
+    get_values_redis,
+    tenant_key,
+)
+from utils.credential_vault import (
+    credentials_status,
+    load_credentials,
+    store_credentials,
+)
+from utils.deadlines import upstream_timeout
 from utils.integrations import IntegrationProcessor
+from utils.item_cache import schedule_prefetch
+from utils.offload import run_decoder
 
 
 CLIENT_ID = settings.AIRTABLE_CLIENT_ID
@@ -49,13 +64,12 @@ class AirTableIntegrationProcessor(IntegrationProcessor):
         )
 
         auth_url = f"{authorization_url}&state={encoded_state}&code_challenge={code_challenge}&code_challenge_method=S256&scope={scope}"
-        await asyncio.gather(
-            add_key_value_redis(
-                f"airtable_state:{org_id}:{user_id}", json.dumps(state_data), expire=600
-            ),
-            add_key_value_redis(
-                f"airtable_verifier:{org_id}:{user_id}", code_verifier, expire=600
-            ),
+        await add_key_values_redis(
+            {
+                tenant_key("airtable_state", org_id, user_id): json.dumps(state_data),
+                tenant_key("airtable_verifier", org_id, user_id): code_verifier,
+            },
+            expire=600,
         )
 
         return auth_url
@@ -74,16 +88,15 @@ class AirTableIntegrationProcessor(IntegrationProcessor):
         user_id = state_data.get("user_id")
         org_id = state_data.get("org_id")
 
-        saved_state, code_verifier = await asyncio.gather(
-            get_value_redis(f"airtable_state:{org_id}:{user_id}"),
-            get_value_redis(f"airtable_verifier:{org_id}:{user_id}"),
-        )
+        state_key = tenant_key("airtable_state", org_id, user_id)
+        verifier_key = tenant_key("airtable_verifier", org_id, user_id)
+        saved_state, code_verifier = await get_values_redis(state_key, verifier_key)
 
         if not saved_state or original_state != json.loads(saved_state).get("state"):
             raise HTTPException(status_code=400, detail="State does not match.")
 
         async with httpx.AsyncClient() as client:
-            response, _, _ = await asyncio.gather(
+            response, _ = await asyncio.gather(
                 client.post(
                     "https://airtable.com/oauth2/v1/token",
                     data={
@@ -98,14 +111,18 @@ class AirTableIntegrationProcessor(IntegrationProcessor):
                         "Content-Type": "application/x-www-form-urlencoded",
                     },
                 ),
-                delete_key_redis(f"airtable_state:{org_id}:{user_id}"),
-                delete_key_redis(f"airtable_verifier:{org_id}:{user_id}"),
+                delete_keys_redis(state_key, verifier_key),
             )
 
-        await add_key_value_redis(
-            f"airtable_credentials:{org_id}:{user_id}",
-            json.dumps(response.json()),
-            expire=600,
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=response.text)
+
+        credentials = json.dumps(response.json())
+        await store_credentials(
+            IntegrationTypeEnum.AIRTABLE, org_id, user_id, credentials
+        )
+        schedule_prefetch(
+            cls, IntegrationTypeEnum.AIRTABLE, credentials, org_id, user_id
         )
 
         close_window_script = """
@@ -119,44 +136,83 @@ class AirTableIntegrationProcessor(IntegrationProcessor):
 
     @classmethod
     async def get_credentials(cls, user_id: str, org_id: str) -> dict:
-        credentials = await get_value_redis(f"airtable_credentials:{org_id}:{user_id}")
+        credentials = await load_credentials(
+            IntegrationTypeEnum.AIRTABLE, org_id, user_id
+        )
         if not credentials:
             raise HTTPException(status_code=400, detail="No credentials found.")
-        credentials = json.loads(credentials)
-        await delete_key_redis(f"airtable_credentials:{org_id}:{user_id}")
 
-        return credentials
+        return credentials_status(credentials)
+
+    @classmethod
+    async def refresh_credentials(cls, credentials: dict) -> dict:
+        async with httpx.AsyncClient() as client:
+            response = await client.post(
+                "https://airtable.com/oauth2/v1/token",
+                data={
+                    "grant_type": "refresh_token",
+                    "refresh_token": credentials.get("refresh_token"),
+                    "client_id": CLIENT_ID,
+                },
+                headers={
+                    "Authorization": f"Basic {encoded_client_id_secret}",
+                    "Content-Type": "application/x-www-form-urlencoded",
+                },
+                timeout=upstream_timeout(),
+            )
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=401, detail="Failed to refresh Airtable credentials."
+            )
+
+        return response.json()
 
     @classmethod
-    async def get_items(cls, credentials: str) -> list[IntegrationItem]:
+    async def iter_items(
+        cls, credentials: str, item_filter: ItemFilter | None = None
+    ) -> AsyncIterator[IntegrationItem]:
+        item_filter = item_filter or ItemFilter()
         credentials = json.loads(credentials)
         url = "https://api.airtable.com/v0/meta/bases"
-        list_of_integration_item_metadata = []
-        list_of_responses = []
+        headers = {"Authorization": f'Bearer {credentials.get("access_token")}'}
 
-        fetch_items(credentials.get("access_token"), url, list_of_responses)
-        for response in list_of_responses:
-            list_of_integration_item_metadata.append(
-                create_integration_item_metadata_object(response, "Base")
-            )
-            tables_response = requests.get(
-                f'https://api.airtable.com/v0/meta/bases/{response.get("id")}/tables',
-                headers={"Authorization": f'Bearer {credentials.get("access_token")}'},
-            )
-            if tables_response.status_code == 200:
-                tables_response = tables_response.json()
-                for table in tables_response["tables"]:
-                    list_of_integration_item_metadata.append(
-                        create_integration_item_metadata_object(
-                            table,
-                            "Table",
-                            response.get("id", None),
-                            response.get("name", None),
-                        )
+        # Tables are parented to `<base id>_Base`, so a parent filter selects
+        # the one base whose schema has to be fetched.
+        base_id = None
+        if item_filter.parent_id is not None:
+            base_id = item_filter.parent_id.removesuffix("_Base")
+        with_tables = item_filter.type is None or item_filter.type.lower() == "table"
+
+        async with httpx.AsyncClient(headers=headers) as client:
+            async for response in fetch_items(client, url):
+                base = create_integration_item_metadata_object(response, "Base")
+                if item_filter.matches(base):
+                    yield base
+                if not with_tables or base_id not in (None, response.get("id")):
+                    continue
+
+                tables_response = await client.get(
+                    f'https://api.airtable.com/v0/meta/bases/{response.get("id")}/tables',
+                    timeout=upstream_timeout(),
+                )
+                if tables_response.status_code != 200:
+                    raise HTTPException(
+                        status_code=tables_response.status_code,
+                        detail="Failed to fetch tables from Airtable.",
                     )
 
-        print(f"list_of_integration_item_metadata: {list_of_integration_item_metadata}")
-        return list_of_integration_item_metadata
+                tables = await run_decoder(
+                    parse_tables_response,
+                    tables_response.content,
+                    response.get("id", None),
+                    response.get("name", None),
+                )
+                for table in tables:
+                    if item_filter.matches(table):
+                        yield table
+
+                if base_id is not None:
+                    return
 
 
 def create_integration_item_metadata_object(
@@ -174,22 +230,38 @@ def create_integration_item_metadata_object(
     return integration_item_metadata
 
 
-def fetch_items(
-    access_token: str, url: str, aggregated_response: list, offset=None
-) -> dict:
-    """Fetching the list of bases"""
-    params = {"offset": offset} if offset is not None else {}
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.get(url, headers=headers, params=params)
-
-    if response.status_code == 200:
-        results = response.json().get("bases", {})
-        offset = response.json().get("offset", None)
+async def fetch_items(
+    client: httpx.AsyncClient, url: str, offset=None
+) -> AsyncIterator[dict]:
+    """Fetching the list of bases, one page at a time"""
+    while True:
+        params = {"offset": offset} if offset is not None else {}
+        response = await client.get(url, params=params, timeout=upstream_timeout())
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail="Failed to fetch bases from Airtable.",
+            )
 
-        for item in results:
-            aggregated_response.append(item)
+        bases, offset = await run_decoder(parse_bases_response, response.content)
+        for item in bases:
+            yield item
 
-        if offset is not None:
-            fetch_items(access_token, url, aggregated_response, offset)
-        else:
+        if offset is None:
             return
+
+
+def parse_bases_response(content: bytes) -> tuple[list[dict], str | None]:
+    """Decodes a page of bases and its pagination offset."""
+    response_json = json.loads(content)
+    return response_json.get("bases", []), response_json.get("offset", None)
+
+
+def parse_tables_response(
+    content: bytes, base_id: str | None, base_name: str | None
+) -> list[IntegrationItem]:
+    """Decodes a base's table schema into table items."""
+    return [
+        create_integration_item_metadata_object(table, "Table", base_id, base_name)
+        for table in json.loads(content)["tables"]
+    ]
@@ -6,11 +6,27 @@ from fastapi.responses import HTMLResponse
 import httpx
 import asyncio
 import base64
-import requests
+from typing import AsyncIterator
+
 from core.config import settings
+from database.enum import IntegrationTypeEnum
 from schemas.integration_item import IntegrationItem
-from redis_client import add_key_value_redis, get_value_redis, delete_key_redis
+from schemas.item_filter import ItemFilter
+from redis_client import (
+    add_key_value_redis,
+    delete_key_redis,
+    get_value_redis,
+    tenant_key,
+)
+from utils.credential_vault import (
+    credentials_status,
+    load_credentials,
+    store_credentials,
+)
+from utils.deadlines import upstream_timeout
 from utils.integrations import IntegrationProcessor
+from utils.item_cache import schedule_prefetch
+from utils.offload import run_decoder
 
 
 CLIENT_ID = settings.HUBSPOT_CLIENT_ID
@@ -39,7 +55,7 @@ class HubSpotIntegrationProcessor(IntegrationProcessor):
 
         """Stores the state data in Redis with an expiration time."""
         try:
-            redis_key = f"hubspot_state:{org_id}:{user_id}"
+            redis_key = tenant_key("hubspot_state", org_id, user_id)
             await add_key_value_redis(redis_key, encoded_state, expire=600)
         except Exception as e:
             # Handle the exception (log it, raise an error, etc.)
@@ -65,7 +81,8 @@ class HubSpotIntegrationProcessor(IntegrationProcessor):
         user_id = state_data.get("user_id")
         org_id = state_data.get("org_id")
 
-        saved_state = await get_value_redis(f"hubspot_state:{org_id}:{user_id}")
+        state_key = tenant_key("hubspot_state", org_id, user_id)
+        saved_state = await get_value_redis(state_key)
 
         if not saved_state or original_state != json.loads(saved_state).get("state"):
             raise HTTPException(status_code=400, detail="State does not match.")
@@ -86,19 +103,24 @@ class HubSpotIntegrationProcessor(IntegrationProcessor):
                         "Content-Type": "application/x-www-form-urlencoded",
                     },
                 ),
-                delete_key_redis(f"hubspot_state:{org_id}:{user_id}"),
+                delete_key_redis(state_key),
             )
 
-        """Stores the state data in Redis with an expiration time."""
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=response.text)
+
+        """Stores the credentials in the vault and warms the item cache."""
+        credentials = json.dumps(response.json())
         try:
-            redis_key = f"hubspot_credentials:{org_id}:{user_id}"
-            await add_key_value_redis(
-                redis_key,
-                json.dumps(response.json()),
-                expire=600,
+            await store_credentials(
+                IntegrationTypeEnum.HUBSPOT, org_id, user_id, credentials
             )
         except Exception as e:
-            raise RuntimeError(f"Failed to store state in Redis: {str(e)}")
+            raise RuntimeError(f"Failed to store credentials in Redis: {str(e)}")
+
+        schedule_prefetch(
+            cls, IntegrationTypeEnum.HUBSPOT, credentials, org_id, user_id
+        )
 
         # Return a simple HTML response to close the window
         close_window_script = """
@@ -112,54 +134,125 @@ class HubSpotIntegrationProcessor(IntegrationProcessor):
 
     @classmethod
     async def get_credentials(cls, user_id: str, org_id: str) -> dict:
-        """Retrieves and deletes HubSpot credentials from Redis."""
-        redis_key = f"hubspot_credentials:{org_id}:{user_id}"
-
-        # Retrieve credentials from Redis
-        credentials = await get_value_redis(redis_key)
+        """Reports whether HubSpot credentials are stored, without the tokens."""
+        credentials = await load_credentials(
+            IntegrationTypeEnum.HUBSPOT, org_id, user_id
+        )
         if not credentials:
             raise HTTPException(status_code=400, detail="No credentials found.")
 
         # Parse the credentials JSON
         try:
-            credentials_data = json.loads(credentials)
+            return credentials_status(credentials)
         except json.JSONDecodeError:
             raise HTTPException(status_code=500, detail="Failed to decode credentials.")
 
-        # Delete the credentials from Redis
-        await delete_key_redis(redis_key)
+    @classmethod
+    async def refresh_credentials(cls, credentials: dict) -> dict:
+        """Exchanges the refresh token for a new access token."""
+        async with httpx.AsyncClient() as client:
+            response = await client.post(
+                "https://api.hubapi.com/oauth/v1/token",
+                data={
+                    "grant_type": "refresh_token",
+                    "refresh_token": credentials.get("refresh_token"),
+                    "client_id": CLIENT_ID,
+                    "client_secret": CLIENT_SECRET,
+                },
+                headers={
+                    "Content-Type": "application/x-www-form-urlencoded",
+                },
+                timeout=upstream_timeout(),
+            )
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=401, detail="Failed to refresh HubSpot credentials."
+            )
 
-        return credentials_data
+        return response.json()
 
     @classmethod
-    async def get_items(cls, credentials: str) -> list[IntegrationItem]:
-        """Fetches items from HubSpot and returns a list of IntegrationItem objects."""
+    async def iter_items(
+        cls, credentials: str, item_filter: ItemFilter | None = None
+    ) -> AsyncIterator[IntegrationItem]:
+        """Fetches items from HubSpot and yields IntegrationItem objects."""
+        item_filter = item_filter or ItemFilter()
+        # Contacts have no type or parent, so such filters can never match.
+        if item_filter.type is not None or item_filter.parent_id is not None:
+            return
+
         credentials_dict = json.loads(credentials)
         access_token = credentials_dict.get("access_token")
 
         if not access_token:
             raise ValueError("Missing access token in credentials.")
 
-        response = requests.get(
-            "https://api.hubapi.com/crm/v3/objects/contacts",
-            headers={
-                "Authorization": f"Bearer {access_token}",
-                "Content-Type": "application/json",
-            },
-        )
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json",
+        }
+        params = {"limit": 100}
+
+        async with httpx.AsyncClient(headers=headers) as client:
+            while True:
+                if item_filter.modified_since is None:
+                    response = await client.get(
+                        "https://api.hubapi.com/crm/v3/objects/contacts",
+                        params=params,
+                        timeout=upstream_timeout(),
+                    )
+                else:
+                    response = await client.post(
+                        "https://api.hubapi.com/crm/v3/objects/contacts/search",
+                        json={**search_body(item_filter), **params},
+                        timeout=upstream_timeout(),
+                    )
+
+                if response.status_code != 200:
+                    raise HTTPException(
+                        status_code=response.status_code,
+                        detail="Failed to fetch items from HubSpot.",
+                    )
+
+                items, after = await run_decoder(
+                    parse_contacts_response, response.content
+                )
+                for item in items:
+                    if item_filter.matches(item):
+                        yield item
+
+                if after is None:
+                    return
+                params["after"] = after
+
+
+def search_body(item_filter: ItemFilter) -> dict:
+    """Translates an item filter into a CRM search request body."""
+    modified_since_ms = int(item_filter.modified_since.timestamp() * 1000)
+    return {
+        "filterGroups": [
+            {
+                "filters": [
+                    {
+                        "propertyName": "lastmodifieddate",
+                        "operator": "GTE",
+                        "value": str(modified_since_ms),
+                    }
+                ]
+            }
+        ],
+        "properties": ["firstname", "lastname", "createdate", "lastmodifieddate"],
+    }
 
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail="Failed to fetch items from HubSpot.",
-            )
 
-        results = response.json().get("results", [])
-        list_of_integration_item_metadata = [
-            create_integration_item_metadata_object(result) for result in results
-        ]
-        print(list_of_integration_item_metadata)
-        return list_of_integration_item_metadata
+def parse_contacts_response(content: bytes) -> tuple[list[IntegrationItem], str | None]:
+    """Decodes a page of contacts into items and the cursor of the next page."""
+    response_json = json.loads(content)
+    items = [
+        create_integration_item_metadata_object(result)
+        for result in response_json.get("results", [])
+    ]
+    return items, response_json.get("paging", {}).get("next", {}).get("after")
 
 
 def create_integration_item_metadata_object(response_json: dict) -> IntegrationItem:
@@ -0,0 +1,76 @@
+from fastapi import HTTPException, Response
+
+from database.enum import IntegrationTypeEnum
+from schemas.integration_item import IntegrationItem
+from schemas.item_filter import ItemFilter
+from utils.admission import admission_controller
+from utils.credential_vault import load_credentials
+from utils.integrations import IntegrationProcessor
+from utils.item_cache import get_or_load_items
+from utils.snapshots import snapshot_delta
+
+
+async def resolve_credentials(
+    integration_processor: type[IntegrationProcessor],
+    integration_type: IntegrationTypeEnum,
+    credentials: str | None,
+    org_id: str | None,
+    user_id: str | None,
+) -> str:
+    """Uses posted credentials if any, otherwise the tenant's vault entry,
+    refreshed when its access token is about to expire."""
+    if credentials is not None:
+        return credentials
+
+    if org_id is not None and user_id is not None:
+        credentials = await load_credentials(
+            integration_type,
+            org_id,
+            user_id,
+            integration_processor.refresh_credentials,
+        )
+        if credentials is not None:
+            return credentials
+
+    raise HTTPException(status_code=400, detail="No credentials found.")
+
+
+async def load_items(
+    integration_processor: type[IntegrationProcessor],
+    integration_type: IntegrationTypeEnum,
+    credentials: str | None,
+    response: Response,
+    org_id: str | None = None,
+    user_id: str | None = None,
+    delta: bool = False,
+    root_hash: str | None = None,
+    subtree_hashes: str | None = None,
+    item_filter: ItemFilter | None = None,
+    refresh: bool = False,
+) -> list[IntegrationItem] | Response | dict:
+    """Shared body of the `/integrations/*/load` routes."""
+    async with admission_controller.admit(org_id):
+        credentials = await resolve_credentials(
+            integration_processor, integration_type, credentials, org_id, user_id
+        )
+        items = await get_or_load_items(
+            integration_processor,
+            integration_type,
+            credentials,
+            org_id,
+            user_id,
+            item_filter,
+            refresh,
+        )
+    if not delta:
+        return items
+
+    return await snapshot_delta(
+        integration_type,
+        items,
+        response,
+        org_id=org_id,
+        user_id=user_id,
+        root_hash=root_hash,
+        subtree_hashes=subtree_hashes,
+    )
@@ -7,12 +7,28 @@ from fastapi.responses import HTMLResponse
 import httpx
 import asyncio
 import base64
-import requests
+from typing import AsyncIterator
+
 from core.config import settings
+from database.enum import IntegrationTypeEnum
 from schemas.integration_item import IntegrationItem
+from schemas.item_filter import ItemFilter
 
-from redis_client import add_key_value_redis, get_value_redis, delete_key_redis
+from redis_client import (
+    add_key_value_redis,
+    delete_key_redis,
+    get_value_redis,
+    tenant_key,
+)
+from utils.credential_vault import (
+    credentials_status,
+    load_credentials,
+    store_credentials,
+)
+from utils.deadlines import upstream_timeout
 from utils.integrations import IntegrationProcessor
+from utils.item_cache import schedule_prefetch
+from utils.offload import run_decoder
 
 CLIENT_ID = settings.NOTION_CLIENT_ID
 CLIENT_SECRET = settings.NOTION_CLIENT_SECRET
@@ -39,7 +55,7 @@ class NotionIntegrationProcessor(IntegrationProcessor):
 
         """Stores the state data in Redis with an expiration time."""
         try:
-            redis_key = f"notion_state:{org_id}:{user_id}"
+            redis_key = tenant_key("notion_state", org_id, user_id)
             await add_key_value_redis(redis_key, encoded_state, expire=600)
         except Exception as e:
             # Handle the exception (log it, raise an error, etc.)
@@ -61,7 +77,8 @@ class NotionIntegrationProcessor(IntegrationProcessor):
         user_id = state_data.get("user_id")
         org_id = state_data.get("org_id")
 
-        saved_state = await get_value_redis(f"notion_state:{org_id}:{user_id}")
+        state_key = tenant_key("notion_state", org_id, user_id)
+        saved_state = await get_value_redis(state_key)
 
         if not saved_state or original_state != json.loads(saved_state).get("state"):
             raise HTTPException(status_code=400, detail="State does not match.")
@@ -80,14 +97,17 @@ class NotionIntegrationProcessor(IntegrationProcessor):
                         "Content-Type": "application/json",
                     },
                 ),
-                delete_key_redis(f"notion_state:{org_id}:{user_id}"),
+                delete_key_redis(state_key),
             )
 
-        await add_key_value_redis(
-            f"notion_credentials:{org_id}:{user_id}",
-            json.dumps(response.json()),
-            expire=600,
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=response.text)
+
+        credentials = json.dumps(response.json())
+        await store_credentials(
+            IntegrationTypeEnum.NOTION, org_id, user_id, credentials
         )
+        schedule_prefetch(cls, IntegrationTypeEnum.NOTION, credentials, org_id, user_id)
 
         close_window_script = """
         <html>
@@ -100,37 +120,107 @@ class NotionIntegrationProcessor(IntegrationProcessor):
 
     @classmethod
     async def get_credentials(cls, user_id: str, org_id: str) -> dict:
-        credentials = await get_value_redis(f"notion_credentials:{org_id}:{user_id}")
-        if not credentials:
-            raise HTTPException(status_code=400, detail="No credentials found.")
-        credentials = json.loads(credentials)
+        credentials = await load_credentials(
+            IntegrationTypeEnum.NOTION, org_id, user_id
+        )
         if not credentials:
             raise HTTPException(status_code=400, detail="No credentials found.")
-        await delete_key_redis(f"notion_credentials:{org_id}:{user_id}")
 
-        return credentials
+        return credentials_status(credentials)
+
+    @classmethod
+    async def refresh_credentials(cls, credentials: dict) -> dict:
+        async with httpx.AsyncClient() as client:
+            response = await client.post(
+                "https://api.notion.com/v1/oauth/token",
+                json={
+                    "grant_type": "refresh_token",
+                    "refresh_token": credentials.get("refresh_token"),
+                },
+                headers={
+                    "Authorization": f"Basic {encoded_client_id_secret}",
+                    "Content-Type": "application/json",
+                },
+                timeout=upstream_timeout(),
+            )
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=401, detail="Failed to refresh Notion credentials."
+            )
+
+        return response.json()
 
     @classmethod
-    async def get_items(cls, credentials: str) -> list[IntegrationItem]:
+    async def iter_items(
+        cls, credentials: str, item_filter: ItemFilter | None = None
+    ) -> AsyncIterator[IntegrationItem]:
         """Aggregates all metadata relevant for a notion integration"""
+        item_filter = item_filter or ItemFilter()
         credentials = json.loads(credentials)
-        response = requests.post(
-            "https://api.notion.com/v1/search",
-            headers={
-                "Authorization": f'Bearer {credentials.get("access_token")}',
-                "Notion-Version": "2022-06-28",
-            },
-        )
+        headers = {
+            "Authorization": f'Bearer {credentials.get("access_token")}',
+            "Notion-Version": "2022-06-28",
+        }
+        body = {"page_size": 100, **search_filters(item_filter)}
 
-        if response.status_code == 200:
-            results = response.json()["results"]
-            list_of_integration_item_metadata = []
-            for result in results:
-                list_of_integration_item_metadata.append(
-                    create_integration_item_metadata_object(result)
+        async with httpx.AsyncClient(headers=headers) as client:
+            while True:
+                response = await client.post(
+                    "https://api.notion.com/v1/search",
+                    json=body,
+                    timeout=upstream_timeout(),
                 )
+                if response.status_code != 200:
+                    raise HTTPException(
+                        status_code=response.status_code,
+                        detail="Failed to fetch items from Notion.",
+                    )
+
+                items, next_cursor = await run_decoder(
+                    parse_search_response, response.content
+                )
+                for item in items:
+                    if not item_filter.is_modified_since(item.last_modified_time):
+                        # Results are sorted by last edit, so the rest are older.
+                        return
+                    if item_filter.matches(item):
+                        yield item
+
+                if next_cursor is None:
+                    return
+                body["start_cursor"] = next_cursor
+
+
+def search_filters(item_filter: ItemFilter) -> dict:
+    """Translates an item filter into Notion search parameters."""
+    body = {}
+    if (item_filter.type or "").lower() in ("page", "database"):
+        body["filter"] = {"property": "object", "value": item_filter.type.lower()}
+
+    if item_filter.modified_since is not None:
+        body["sort"] = {"direction": "descending", "timestamp": "last_edited_time"}
+
+    if item_filter.name_prefix:
+        # Item names are prefixed with the object type, page titles are not.
+        query = item_filter.name_prefix
+        for object_type in ("page ", "database "):
+            if query.lower().startswith(object_type):
+                query = query[len(object_type) :]
+        if query:
+            body["query"] = query
+
+    return body
+
 
-        return list_of_integration_item_metadata
+def parse_search_response(content: bytes) -> tuple[list[IntegrationItem], str | None]:
+    """Decodes a search page into items and the cursor of the next page."""
+    response_json = json.loads(content)
+    items = [
+        create_integration_item_metadata_object(result)
+        for result in response_json["results"]
+    ]
+    next_cursor = response_json["next_cursor"] if response_json.get("has_more") else None
+    return items, next_cursor
 
 
 def _recursive_dict_search(data, target_key):
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import pytest
+from cryptography.fernet import Fernet
+
+import utils.credential_vault as vault
+from core.config import settings
+from database.enum import IntegrationTypeEnum
+
+
+class StubLock:
+    def __init__(self, key, timeout):
+        pass
+
+    async def acquire(self) -> bool:
+        return True
+
+    async def release(self) -> None:
+        pass
+
+
+@pytest.fixture(autouse=True)
+def stub_vault(monkeypatch):
+    store = {}
+
+    async def add_key_value_redis(key, value, expire=None):
+        store[key] = value
+
+    async def get_value_redis(key):
+        return store.get(key)
+
+    monkeypatch.setattr(
+        settings, "CREDENTIAL_VAULT_KEYS", Fernet.generate_key().decode()
+    )
+    monkeypatch.setattr(vault, "_fernet", None)
+    monkeypatch.setattr(vault, "add_key_value_redis", add_key_value_redis)
+    monkeypatch.setattr(vault, "get_value_redis", get_value_redis)
+    monkeypatch.setattr(vault, "lock_redis", StubLock)
+    vault._decrypted.clear()
+    return store
+
+
+def _store(**token) -> None:
+    asyncio.run(
+        vault.store_credentials(
+            IntegrationTypeEnum.HUBSPOT, "org", "user", json.dumps(token)
+        )
+    )
+
+
+def test_expiring_token_is_refreshed_once():
+    _store(access_token="old", refresh_token="refresh", expires_in=30)
+    refreshes = 0
+
+    async def refresh(credentials: dict) -> dict:
+        nonlocal refreshes
+        refreshes += 1
+        assert credentials["refresh_token"] == "refresh"
+        await asyncio.sleep(0.01)
+        return {"access_token": "new", "expires_in": 1800}
+
+    async def main():
+        return await asyncio.gather(
+            *(
+                vault.load_credentials(
+                    IntegrationTypeEnum.HUBSPOT, "org", "user", refresh
+                )
+                for _ in range(5)
+            )
+        )
+
+    loaded = [json.loads(credentials) for credentials in asyncio.run(main())]
+
+    assert refreshes == 1
+    assert {credentials["access_token"] for credentials in loaded} == {"new"}
+    # The refresh token is kept when the provider leaves it out.
+    assert loaded[0]["refresh_token"] == "refresh"
+
+
+def test_fresh_token_is_served_from_cache_without_parsing(monkeypatch):
+    _store(access_token="token", expires_in=3600)
+
+    async def refresh(credentials: dict) -> dict:
+        raise AssertionError("Token should not be refreshed.")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Cached credentials should not be parsed.")
+
+    monkeypatch.setattr(vault.json, "loads", fail)
+    credentials = asyncio.run(
+        vault.load_credentials(IntegrationTypeEnum.HUBSPOT, "org", "user", refresh)
+    )
+
+    assert '"token"' in credentials
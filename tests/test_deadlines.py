@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from prometheus_client import REGISTRY
+
+from core.config import settings
+from database.enum import IntegrationTypeEnum
+from utils.deadlines import (
+    DEADLINE_HEADER,
+    iter_within_deadline,
+    request_budget,
+    run_with_deadline,
+)
+
+
+class StubRequest:
+    """Request whose client disconnects after `disconnect_after` seconds."""
+
+    def __init__(
+        self, headers: dict | None = None, disconnect_after: float | None = None
+    ):
+        self.headers = headers or {}
+        self._disconnect_at = (
+            None
+            if disconnect_after is None
+            else asyncio.get_running_loop().time() + disconnect_after
+        )
+
+    async def is_disconnected(self) -> bool:
+        if self._disconnect_at is None:
+            return False
+        return asyncio.get_running_loop().time() >= self._disconnect_at
+
+
+def _cancelled(metric: str, reason: str) -> float:
+    value = REGISTRY.get_sample_value(
+        metric, {"provider": IntegrationTypeEnum.NOTION.value, "reason": reason}
+    )
+    return value or 0.0
+
+
+@pytest.fixture(autouse=True)
+def fast_disconnect_polling(monkeypatch):
+    monkeypatch.setattr(settings, "DISCONNECT_POLL_INTERVAL", 0.01)
+
+
+def test_returns_result_of_work():
+    async def main():
+        async def work():
+            return "items"
+
+        return await run_with_deadline(
+            StubRequest(), IntegrationTypeEnum.NOTION, work()
+        )
+
+    assert asyncio.run(main()) == "items"
+
+
+def test_disconnect_cancels_work_and_answers_499():
+    cancelled_before = _cancelled("integration_loads_cancelled_total", "disconnect")
+    budget_before = _cancelled(
+        "integration_cancelled_budget_seconds_total", "disconnect"
+    )
+    work_cancelled = False
+
+    async def main():
+        async def work():
+            nonlocal work_cancelled
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                work_cancelled = True
+                raise
+
+        return await run_with_deadline(
+            StubRequest(disconnect_after=0.1), IntegrationTypeEnum.NOTION, work()
+        )
+
+    response = asyncio.run(main())
+
+    assert response.status_code == 499
+    assert work_cancelled
+    assert (
+        _cancelled("integration_loads_cancelled_total", "disconnect")
+        == cancelled_before + 1
+    )
+    assert (
+        _cancelled("integration_cancelled_budget_seconds_total", "disconnect")
+        > budget_before
+    )
+
+
+def test_deadline_answers_504():
+    cancelled_before = _cancelled("integration_loads_cancelled_total", "deadline")
+
+    async def main():
+        async def work():
+            await asyncio.sleep(1)
+
+        return await run_with_deadline(
+            StubRequest(headers={DEADLINE_HEADER: "0.1"}),
+            IntegrationTypeEnum.NOTION,
+            work(),
+        )
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main())
+
+    assert excinfo.value.status_code == 504
+    assert (
+        _cancelled("integration_loads_cancelled_total", "deadline")
+        == cancelled_before + 1
+    )
+
+
+@pytest.mark.parametrize("header", ["nan", "inf", "-inf", "soon"])
+def test_invalid_budget_header_is_rejected(header):
+    async def main():
+        return request_budget(StubRequest(headers={DEADLINE_HEADER: header}), 60.0)
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main())
+
+    assert excinfo.value.status_code == 400
+
+
+def test_stream_can_be_finalized_from_another_task():
+    async def main():
+        async def items():
+            yield 1
+            yield 2
+
+        stream = iter_within_deadline(IntegrationTypeEnum.NOTION, items(), 10)
+        # Tasks run in copies of the context, as when a cancelled streaming
+        # response's generator is closed by asyncio.
+        assert await asyncio.create_task(stream.__anext__()) == 1
+        await asyncio.create_task(stream.aclose())
+
+    asyncio.run(main())
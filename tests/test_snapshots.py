@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException, Response
+
+import utils.snapshots as snapshots
+from database.enum import IntegrationTypeEnum
+from schemas.integration_item import IntegrationItem
+
+
+@pytest.fixture
+def redis_store(monkeypatch):
+    store = {}
+
+    async def add_key_value_redis(key, value, expire=None):
+        store[key] = value
+
+    async def get_value_redis(key):
+        return store.get(key)
+
+    async def expire_key_redis(key, expire):
+        pass
+
+    monkeypatch.setattr(snapshots, "add_key_value_redis", add_key_value_redis)
+    monkeypatch.setattr(snapshots, "get_value_redis", get_value_redis)
+    monkeypatch.setattr(snapshots, "expire_key_redis", expire_key_redis)
+    return store
+
+
+def _tree(c_name: str = "C") -> list[IntegrationItem]:
+    """A -> B -> C, where C is the only item whose content varies."""
+    return [
+        IntegrationItem(id="a", name="A"),
+        IntegrationItem(id="b", name="B", parent_id="a"),
+        IntegrationItem(id="c", name=c_name, parent_id="b"),
+    ]
+
+
+def _delta(items, **kwargs):
+    return asyncio.run(
+        snapshots.snapshot_delta(
+            IntegrationTypeEnum.NOTION,
+            items,
+            Response(),
+            org_id="org",
+            user_id="user",
+            **kwargs,
+        )
+    )
+
+
+def _ids(items) -> set[str]:
+    return {item.id for item in items}
+
+
+def test_unknown_base_is_a_full_resync(redis_store):
+    delta = _delta(_tree(), root_hash="expired")
+
+    assert delta["full"] is True
+    assert _ids(delta["added"]) == {"a", "b", "c"}
+    assert delta["removed"] == []
+    assert set(delta["subtree_hashes"]) == {"a", "b", "c"}
+
+
+def test_root_hash_diff(redis_store):
+    first = _delta(_tree())
+
+    assert _delta(_tree(), root_hash=first["root_hash"]).status_code == 304
+
+    items = _tree("C2") + [IntegrationItem(id="d", name="D", parent_id="a")]
+    delta = _delta(items, root_hash=first["root_hash"])
+
+    assert delta["full"] is False
+    assert _ids(delta["added"]) == {"d"}
+    assert _ids(delta["changed"]) == {"c"}
+    # Ancestors of changed items have new subtree hashes as well.
+    assert set(delta["subtree_hashes"]) == {"a", "b", "c", "d"}
+
+    delta = _delta(_tree()[:2], root_hash=delta["root_hash"])
+
+    assert set(delta["removed"]) == {"c", "d"}
+    assert set(delta["subtree_hashes"]) == {"a", "b"}
+
+
+def test_subtree_hashes_track_ancestors_across_deltas(redis_store):
+    first = _delta(_tree())
+    client_hashes = dict(first["subtree_hashes"])
+
+    second = _delta(_tree("C2"), root_hash=first["root_hash"])
+    client_hashes.update(second["subtree_hashes"])
+
+    redis_store.clear()
+    third = _delta(_tree(), subtree_hashes=json.dumps(client_hashes))
+
+    assert third["full"] is False
+    assert _ids(third["changed"]) == {"a", "b", "c"}
+    assert third["removed"] == []
+
+
+def test_subtree_hashes_skip_unchanged_subtrees(redis_store):
+    first = _delta(_tree())
+
+    redis_store.clear()
+    delta = _delta(_tree(), subtree_hashes=json.dumps(first["subtree_hashes"]))
+
+    assert delta["added"] == [] and delta["changed"] == [] and delta["removed"] == []
+
+
+@pytest.mark.parametrize("subtree_hashes", ["not json", "[1, 2]", '{"a": 1}'])
+def test_malformed_subtree_hashes_are_rejected(redis_store, subtree_hashes):
+    with pytest.raises(HTTPException) as excinfo:
+        _delta(_tree(), subtree_hashes=subtree_hashes)
+
+    assert excinfo.value.status_code == 400
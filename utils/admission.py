@@ -0,0 +1,182 @@
+import asyncio
+import math
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import HTTPException
+
+from core.config import settings
+from utils.metrics import (
+    ADMISSION_ACTIVE,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_REJECTED,
+    ADMISSION_WAIT_SECONDS,
+)
+
+
+class AdmissionController:
+    """Caps concurrent loads globally and per org, queueing the overflow.
+
+    Waiting requests are dequeued by weighted round robin across orgs: each
+    org with waiters gets up to its weight in admissions per turn. When the
+    queue is full, requests are shed right away with a 429. Requests without
+    an org (`org_id=None`) share one bucket with its own cap and weight.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_per_org: int,
+        max_queue: int,
+        org_weights: dict[str, int] | None = None,
+        max_unattributed: int | None = None,
+        unattributed_weight: int = 1,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_per_org = max_per_org
+        self.max_queue = max_queue
+        self.org_weights = org_weights or {}
+        self.max_unattributed = max_unattributed or max_per_org
+        self.unattributed_weight = unattributed_weight
+
+        self._active = 0
+        self._active_per_org: dict[str | None, int] = defaultdict(int)
+        self._queues: dict[str | None, deque[asyncio.Future]] = {}
+        self._credits: dict[str | None, int] = {}
+        self._rotation: deque[str | None] = deque()
+        self._queued = 0
+        # Moving average of how long an admitted load holds its slot.
+        self._hold_seconds = 1.0
+
+    @asynccontextmanager
+    async def admit(self, org_id: str | None) -> AsyncIterator[None]:
+        await self._acquire(org_id)
+        admitted_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self._hold_seconds = 0.9 * self._hold_seconds + 0.1 * (
+                time.monotonic() - admitted_at
+            )
+            self._release(org_id)
+
+    def _cap(self, org_id: str | None) -> int:
+        return self.max_unattributed if org_id is None else self.max_per_org
+
+    def _weight(self, org_id: str | None) -> int:
+        if org_id is None:
+            return self.unattributed_weight
+        return self.org_weights.get(org_id, 1)
+
+    def _below_cap(self, org_id: str | None) -> bool:
+        return self._active_per_org.get(org_id, 0) < self._cap(org_id)
+
+    def _has_capacity(self, org_id: str | None) -> bool:
+        return self._active < self.max_concurrency and self._below_cap(org_id)
+
+    def _retry_after(self) -> int:
+        waves = (self._queued + 1) / self.max_concurrency
+        return max(1, math.ceil(waves * self._hold_seconds))
+
+    async def _acquire(self, org_id: str | None) -> None:
+        if self._has_capacity(org_id) and org_id not in self._queues:
+            self._grant(org_id)
+            ADMISSION_WAIT_SECONDS.observe(0)
+            return
+
+        if self._queued >= self.max_queue:
+            ADMISSION_REJECTED.inc()
+            raise HTTPException(
+                status_code=429,
+                detail="Too many concurrent loads, retry later.",
+                headers={"Retry-After": str(self._retry_after())},
+            )
+
+        waiter = asyncio.get_running_loop().create_future()
+        if org_id not in self._queues:
+            self._queues[org_id] = deque()
+            self._credits[org_id] = self._weight(org_id)
+            self._rotation.append(org_id)
+        self._queues[org_id].append(waiter)
+        self._queued += 1
+        ADMISSION_QUEUE_DEPTH.set(self._queued)
+
+        queued_at = time.monotonic()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just before being cancelled; hand the slot back.
+                self._release(org_id)
+            else:
+                self._forget(org_id, waiter)
+            raise
+        ADMISSION_WAIT_SECONDS.observe(time.monotonic() - queued_at)
+
+    def _grant(self, org_id: str | None) -> None:
+        self._active += 1
+        self._active_per_org[org_id] += 1
+        ADMISSION_ACTIVE.set(self._active)
+
+    def _release(self, org_id: str | None) -> None:
+        self._active -= 1
+        self._active_per_org[org_id] -= 1
+        if not self._active_per_org[org_id]:
+            del self._active_per_org[org_id]
+        ADMISSION_ACTIVE.set(self._active)
+        self._dispatch()
+
+    def _forget(self, org_id: str | None, waiter: asyncio.Future) -> None:
+        queue = self._queues.get(org_id)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self._queued -= 1
+        ADMISSION_QUEUE_DEPTH.set(self._queued)
+        if not queue:
+            self._drop_org(org_id)
+        self._dispatch()
+
+    def _drop_org(self, org_id: str | None) -> None:
+        del self._queues[org_id]
+        del self._credits[org_id]
+        self._rotation.remove(org_id)
+
+    def _dispatch(self) -> None:
+        while self._active < self.max_concurrency and self._rotation:
+            # Skip orgs already at their own cap; stop once every waiting org is.
+            for _ in range(len(self._rotation)):
+                if self._below_cap(self._rotation[0]):
+                    break
+                self._rotation.rotate(-1)
+            else:
+                return
+
+            org_id = self._rotation[0]
+            queue = self._queues[org_id]
+            waiter = queue.popleft()
+            self._queued -= 1
+            ADMISSION_QUEUE_DEPTH.set(self._queued)
+
+            if not waiter.done():
+                self._grant(org_id)
+                waiter.set_result(None)
+                self._credits[org_id] -= 1
+
+            if not queue:
+                self._drop_org(org_id)
+            elif self._credits[org_id] <= 0:
+                self._credits[org_id] = self._weight(org_id)
+                self._rotation.rotate(-1)
+
+
+admission_controller = AdmissionController(
+    max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+    max_per_org=settings.ADMISSION_MAX_PER_ORG,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    org_weights=settings.ADMISSION_ORG_WEIGHTS,
+    max_unattributed=settings.ADMISSION_MAX_UNATTRIBUTED,
+    unattributed_weight=settings.ADMISSION_UNATTRIBUTED_WEIGHT,
+)
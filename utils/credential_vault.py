@@ -0,0 +1,182 @@
+import asyncio
+import json
+import time
+import weakref
+from contextlib import suppress
+from typing import Awaitable, Callable
+
+from cachetools import TTLCache
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from fastapi import HTTPException
+from redis.exceptions import LockError
+
+from core.config import settings
+from database.enum import IntegrationTypeEnum
+from redis_client import (
+    add_key_value_redis,
+    delete_key_redis,
+    get_value_redis,
+    lock_redis,
+    tenant_key,
+)
+
+
+# Decrypted credentials with their access token's expiry, so hot loads skip
+# the Redis round trip, decryption and parsing. Entries expire so that
+# credentials replaced by another worker are picked up.
+_decrypted: TTLCache[str, tuple[str, float | None]] = TTLCache(
+    maxsize=settings.CREDENTIAL_CACHE_SIZE, ttl=settings.CREDENTIAL_CACHE_TTL
+)
+_fernet: MultiFernet | None = None
+
+# Serializes refreshes of one tenant's tokens within this worker; the Redis
+# lock does the same across workers.
+_refresh_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = (
+    weakref.WeakValueDictionary()
+)
+
+# How long a worker may hold a tenant's refresh lock, in seconds.
+_REFRESH_LOCK_TIMEOUT = 30
+
+
+def _get_fernet() -> MultiFernet:
+    """Encrypts with the first configured key, decrypts with any of them."""
+    global _fernet
+    if _fernet is None:
+        keys = [key.strip() for key in settings.CREDENTIAL_VAULT_KEYS.split(",")]
+        keys = [key for key in keys if key]
+        if not keys:
+            raise RuntimeError("CREDENTIAL_VAULT_KEYS is not configured.")
+        _fernet = MultiFernet([Fernet(key) for key in keys])
+    return _fernet
+
+
+def check_vault_keys() -> None:
+    """Fails on missing or malformed keys, e.g. at startup rather than in
+    the middle of an OAuth callback."""
+    _get_fernet()
+
+
+def _vault_key(integration_type: IntegrationTypeEnum, org_id: str, user_id: str) -> str:
+    return tenant_key(f"{integration_type.value.lower()}_vault", org_id, user_id)
+
+
+def _with_expiry(credentials: str) -> tuple[str, float | None]:
+    """Stamps a token response's relative `expires_in` as an absolute time."""
+    token = json.loads(credentials)
+    if token.get("expires_in") is not None:
+        token["expires_at"] = time.time() + float(token["expires_in"])
+    return json.dumps(token), token.get("expires_at")
+
+
+def _expires_soon(expires_at: float | None) -> bool:
+    if expires_at is None:
+        return False
+    return expires_at - time.time() <= settings.CREDENTIAL_REFRESH_MARGIN
+
+
+def credentials_status(credentials: str) -> dict:
+    """Describes stored credentials without revealing their tokens."""
+    token = json.loads(credentials)
+    return {
+        "connected": True,
+        "expires_at": token.get("expires_at"),
+        "scope": token.get("scope"),
+    }
+
+
+async def store_credentials(
+    integration_type: IntegrationTypeEnum, org_id: str, user_id: str, credentials: str
+) -> str:
+    """Stores a tenant's credentials encrypted and without expiry.
+
+    Returns the credentials as stored, with the access token's expiry.
+    """
+    key = _vault_key(integration_type, org_id, user_id)
+    credentials, expires_at = _with_expiry(credentials)
+    await add_key_value_redis(key, _get_fernet().encrypt(credentials.encode("utf-8")))
+    _decrypted[key] = (credentials, expires_at)
+    return credentials
+
+
+async def _read(key: str) -> tuple[str, float | None] | None:
+    """Decrypted credentials and their access token's expiry."""
+    cached = _decrypted.get(key)
+    if cached is not None:
+        return cached
+
+    encrypted = await get_value_redis(key)
+    if encrypted is None:
+        return None
+
+    try:
+        credentials = _get_fernet().decrypt(encrypted).decode("utf-8")
+    except InvalidToken:
+        return None
+
+    cached = (credentials, json.loads(credentials).get("expires_at"))
+    _decrypted[key] = cached
+    return cached
+
+
+async def _refresh(
+    integration_type: IntegrationTypeEnum,
+    org_id: str,
+    user_id: str,
+    refresh: Callable[[dict], Awaitable[dict]],
+) -> str | None:
+    key = _vault_key(integration_type, org_id, user_id)
+    lock = _refresh_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        redis_lock = lock_redis(f"{key}:refresh", _REFRESH_LOCK_TIMEOUT)
+        if not await redis_lock.acquire():
+            raise HTTPException(
+                status_code=503, detail="Credentials are being refreshed, retry later."
+            )
+        try:
+            # Another request or worker may have refreshed while we waited.
+            _decrypted.pop(key, None)
+            stored = await _read(key)
+            if stored is None:
+                return None
+            credentials, expires_at = stored
+            if not _expires_soon(expires_at):
+                return credentials
+
+            current = json.loads(credentials)
+            refreshed = await refresh(current)
+            # Providers may leave out the refresh token when it is unchanged.
+            refreshed.setdefault("refresh_token", current.get("refresh_token"))
+            return await store_credentials(
+                integration_type, org_id, user_id, json.dumps(refreshed)
+            )
+        finally:
+            with suppress(LockError):
+                # Expired while held; another worker may own it by now.
+                await redis_lock.release()
+
+
+async def load_credentials(
+    integration_type: IntegrationTypeEnum,
+    org_id: str,
+    user_id: str,
+    refresh: Callable[[dict], Awaitable[dict]] | None = None,
+) -> str | None:
+    """Returns a tenant's credentials, refreshing the access token with
+    `refresh` when it is about to expire."""
+    stored = await _read(_vault_key(integration_type, org_id, user_id))
+    if stored is None:
+        return None
+    credentials, expires_at = stored
+    if refresh is None or not _expires_soon(expires_at):
+        return credentials
+
+    return await _refresh(integration_type, org_id, user_id, refresh)
+
+
+async def delete_credentials(
+    integration_type: IntegrationTypeEnum, org_id: str, user_id: str
+) -> None:
+    key = _vault_key(integration_type, org_id, user_id)
+    _decrypted.pop(key, None)
+    await delete_key_redis(key)
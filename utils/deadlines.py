@@ -0,0 +1,138 @@
+import asyncio
+import math
+import time
+from contextvars import ContextVar
+from typing import AsyncIterator, Coroutine, TypeVar
+
+import httpx
+from fastapi import HTTPException, Request, Response
+
+from core.config import settings
+from database.enum import IntegrationTypeEnum
+from utils.metrics import CANCELLED_BUDGET_SECONDS, CANCELLED_LOADS
+
+
+T = TypeVar("T")
+
+DEADLINE_HEADER = "X-Request-Timeout"
+
+# Absolute `time.monotonic()` deadline of the request being served.
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+def request_budget(request: Request, default_budget: float) -> float:
+    """Budget in seconds from `X-Request-Timeout`, capped by the config."""
+    header = request.headers.get(DEADLINE_HEADER)
+    if header is None:
+        return default_budget
+
+    try:
+        budget = float(header)
+    except ValueError:
+        budget = math.nan
+    if not math.isfinite(budget):
+        raise HTTPException(status_code=400, detail=f"Invalid {DEADLINE_HEADER}.")
+
+    return min(max(budget, 0.0), settings.MAX_REQUEST_TIMEOUT)
+
+
+def remaining() -> float | None:
+    """Seconds left before the current deadline, or None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else max(deadline - time.monotonic(), 0.0)
+
+
+def upstream_timeout(default: float = 5.0) -> float:
+    """Timeout for the next upstream call, bounded by the request deadline."""
+    budget = remaining()
+    if budget is None:
+        return default
+    if budget <= 0:
+        raise DeadlineExceeded("Request deadline exceeded.")
+    return budget
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while not await request.is_disconnected():
+        await asyncio.sleep(settings.DISCONNECT_POLL_INTERVAL)
+
+
+async def run_with_deadline(
+    request: Request,
+    integration_type: IntegrationTypeEnum,
+    work: Coroutine[None, None, T],
+    default_budget: float | None = None,
+) -> T | Response:
+    """Runs `work` under the request budget, cancelling it if the client leaves.
+
+    Upstream and Redis calls made by `work` read the deadline to bound their
+    own timeouts. A load past its deadline fails with 504; a load whose
+    client disconnected is cancelled and answered with 499.
+    """
+    try:
+        budget = request_budget(request, default_budget or settings.LOAD_TIMEOUT)
+    except HTTPException:
+        work.close()
+        raise
+    deadline = time.monotonic() + budget
+    provider = integration_type.value
+
+    async def run() -> T:
+        _deadline.set(deadline)
+        async with asyncio.timeout(budget):
+            return await work
+
+    work_task = asyncio.create_task(run())
+    disconnect_task = asyncio.create_task(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait(
+            {work_task, disconnect_task}, return_when=asyncio.FIRST_COMPLETED
+        )
+    finally:
+        disconnect_task.cancel()
+        client_left = not work_task.done()
+        if client_left:
+            budget_left = max(deadline - time.monotonic(), 0.0)
+            work_task.cancel()
+            # Cancellation is only delivered once the task runs again.
+            await asyncio.gather(work_task, return_exceptions=True)
+
+    if client_left:
+        CANCELLED_LOADS.labels(provider, "disconnect").inc()
+        CANCELLED_BUDGET_SECONDS.labels(provider, "disconnect").inc(budget_left)
+        return Response(status_code=499)
+
+    try:
+        return work_task.result()
+    except (TimeoutError, httpx.TimeoutException):
+        if time.monotonic() < deadline:
+            raise
+        CANCELLED_LOADS.labels(provider, "deadline").inc()
+        raise HTTPException(status_code=504, detail="Request deadline exceeded.")
+
+
+async def iter_within_deadline(
+    integration_type: IntegrationTypeEnum,
+    items: AsyncIterator[T],
+    budget: float,
+) -> AsyncIterator[T]:
+    """Bounds a streamed crawl by the request budget.
+
+    Streaming responses have already sent their headers, so a deadline cannot
+    turn into a 504. Instead the stream is cut after the last complete chunk
+    without its end-of-stream marker, which readers detect as truncated.
+    Disconnects are handled by the streaming response, which cancels it.
+    """
+    deadline = time.monotonic() + budget
+    # Not reset afterwards: a cancelled stream is finalized in another task,
+    # where the token is invalid, and the response's context ends with it.
+    _deadline.set(deadline)
+    async for item in items:
+        if time.monotonic() >= deadline:
+            CANCELLED_LOADS.labels(integration_type.value, "deadline").inc()
+            raise DeadlineExceeded("Request deadline exceeded.")
+        yield item
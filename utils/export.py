@@ -0,0 +1,172 @@
+from datetime import datetime
+from typing import AsyncIterator
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from starlette.concurrency import run_in_threadpool
+
+from core.config import settings
+from database.enum import ExportFormatEnum, IntegrationTypeEnum
+from schemas.integration_item import IntegrationItem
+
+
+_dictionary_string = pa.dictionary(pa.int32(), pa.string())
+_timestamp = pa.timestamp("us", tz="UTC")
+
+ITEM_SCHEMA: pa.Schema = pa.schema(
+    [
+        pa.field("provider", _dictionary_string, nullable=False),
+        pa.field("id", pa.string()),
+        pa.field("type", _dictionary_string),
+        pa.field("directory", pa.bool_()),
+        pa.field("parent_path_or_name", pa.string()),
+        pa.field("parent_id", pa.string()),
+        pa.field("name", pa.string()),
+        pa.field("creation_time", _timestamp),
+        pa.field("last_modified_time", _timestamp),
+        pa.field("url", pa.string()),
+        pa.field("children", pa.list_(pa.string())),
+        pa.field("mime_type", pa.string()),
+        pa.field("delta", pa.string()),
+        pa.field("drive_id", pa.string()),
+        pa.field("visibility", pa.bool_()),
+    ]
+)
+
+_string_columns = (
+    "id",
+    "parent_path_or_name",
+    "parent_id",
+    "name",
+    "url",
+    "mime_type",
+    "delta",
+    "drive_id",
+)
+
+
+def _to_datetime(value: datetime | str | None) -> datetime | None:
+    """Providers return ISO 8601 strings, which may end with `Z`."""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def _optional_str(value) -> str | None:
+    return None if value is None else str(value)
+
+
+def _record_batch(
+    integration_type: IntegrationTypeEnum, items: list[IntegrationItem]
+) -> pa.RecordBatch:
+    columns = {
+        "provider": pa.array(
+            [integration_type.value] * len(items), pa.string()
+        ).dictionary_encode(),
+        "type": pa.array([item.type for item in items], pa.string()).dictionary_encode(),
+        "directory": pa.array([item.directory for item in items], pa.bool_()),
+        "creation_time": pa.array(
+            [_to_datetime(item.creation_time) for item in items], _timestamp
+        ),
+        "last_modified_time": pa.array(
+            [_to_datetime(item.last_modified_time) for item in items], _timestamp
+        ),
+        "children": pa.array([item.children for item in items], pa.list_(pa.string())),
+        "visibility": pa.array([item.visibility for item in items], pa.bool_()),
+    }
+    for column in _string_columns:
+        columns[column] = pa.array(
+            [_optional_str(getattr(item, column)) for item in items], pa.string()
+        )
+
+    return pa.RecordBatch.from_arrays(
+        [columns[field.name] for field in ITEM_SCHEMA], schema=ITEM_SCHEMA
+    )
+
+
+async def iter_record_batches(
+    integration_type: IntegrationTypeEnum,
+    items: AsyncIterator[IntegrationItem],
+    batch_size: int | None = None,
+) -> AsyncIterator[pa.RecordBatch]:
+    """Groups an item stream into record batches of at most `batch_size` rows.
+
+    Batches are built in the threadpool so large exports do not block the
+    event loop.
+    """
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    pending: list[IntegrationItem] = []
+    async for item in items:
+        pending.append(item)
+        if len(pending) >= batch_size:
+            yield await run_in_threadpool(_record_batch, integration_type, pending)
+            pending = []
+
+    if pending:
+        yield await run_in_threadpool(_record_batch, integration_type, pending)
+
+
+class _ChunkSink:
+    """Write-only file object whose written bytes are drained after each batch."""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+_media_types = {
+    ExportFormatEnum.ARROW: "application/vnd.apache.arrow.stream",
+    ExportFormatEnum.PARQUET: "application/vnd.apache.parquet",
+}
+
+
+def export_media_type(export_format: ExportFormatEnum) -> str:
+    return _media_types[export_format]
+
+
+async def stream_export(
+    integration_type: IntegrationTypeEnum,
+    items: AsyncIterator[IntegrationItem],
+    export_format: ExportFormatEnum = ExportFormatEnum.ARROW,
+) -> AsyncIterator[bytes]:
+    """Encodes an item stream as an Arrow IPC stream or a Parquet file.
+
+    Only one record batch is held in memory at a time, and its encoded
+    bytes are yielded before the next batch is built. Building and encoding
+    run in the threadpool. If the item stream fails part way, the writer is
+    not closed, so the output lacks its end-of-stream marker (Arrow) or
+    footer (Parquet) and reads as truncated.
+    """
+    sink = _ChunkSink()
+    output = pa.PythonFile(sink, mode="w")
+    if export_format == ExportFormatEnum.PARQUET:
+        writer = pq.ParquetWriter(output, ITEM_SCHEMA)
+    else:
+        writer = pa.ipc.new_stream(output, ITEM_SCHEMA)
+
+    async for batch in iter_record_batches(integration_type, items):
+        await run_in_threadpool(writer.write_batch, batch)
+        yield sink.drain()
+
+    await run_in_threadpool(writer.close)
+    yield sink.drain()
@@ -1,9 +1,11 @@
 from abc import ABC, abstractmethod
+from typing import AsyncIterator
 
 from fastapi import Request
 from fastapi.responses import HTMLResponse
 
 from schemas.integration_item import IntegrationItem
+from schemas.item_filter import ItemFilter
 
 
 class IntegrationProcessor(ABC):
@@ -24,5 +26,27 @@ class IntegrationProcessor(ABC):
 
     @classmethod
     @abstractmethod
-    async def get_items(cls, credentials: str) -> list[IntegrationItem]:
+    async def refresh_credentials(cls, credentials: dict) -> dict:
+        """Exchanges the refresh token for a new token response.
+
+        Only called for credentials whose token response carried an expiry.
+        """
+        pass
+
+    @classmethod
+    @abstractmethod
+    def iter_items(
+        cls, credentials: str, item_filter: ItemFilter | None = None
+    ) -> AsyncIterator[IntegrationItem]:
+        """Yields items page by page as they are fetched from the provider.
+
+        Filters are pushed down to the provider where possible and applied
+        to the remaining items as they stream through.
+        """
         pass
+
+    @classmethod
+    async def get_items(
+        cls, credentials: str, item_filter: ItemFilter | None = None
+    ) -> list[IntegrationItem]:
+        return [item async for item in cls.iter_items(credentials, item_filter)]
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import logging
+
+from core.config import settings
+from database.enum import IntegrationTypeEnum
+from redis_client import add_key_value_redis, get_value_redis, tenant_key
+from schemas.integration_item import IntegrationItem
+from schemas.item_filter import ItemFilter
+from utils.integrations import IntegrationProcessor
+
+
+logger = logging.getLogger(__name__)
+
+
+class _InFlightLoad:
+    def __init__(self, task: asyncio.Task, promoted: asyncio.Event):
+        self.task = task
+        self.promoted = promoted
+
+
+# Crawls currently running in this worker, keyed by item cache key, so that
+# concurrent loads of one tenant share a single crawl.
+_in_flight: dict[str, _InFlightLoad] = {}
+
+# Background warm-ups run with bounded concurrency so they never crowd out
+# interactive loads.
+_prefetch_slots = asyncio.Semaphore(settings.PREFETCH_CONCURRENCY)
+
+
+def _cache_key(integration_type: IntegrationTypeEnum, org_id: str, user_id: str) -> str:
+    return tenant_key(f"{integration_type.value.lower()}_items", org_id, user_id)
+
+
+async def get_cached_items(
+    integration_type: IntegrationTypeEnum, org_id: str, user_id: str
+) -> list[IntegrationItem] | None:
+    cached = await get_value_redis(_cache_key(integration_type, org_id, user_id))
+    if cached is None:
+        return None
+    return [IntegrationItem(**item) for item in json.loads(cached)]
+
+
+async def set_cached_items(
+    integration_type: IntegrationTypeEnum,
+    org_id: str,
+    user_id: str,
+    items: list[IntegrationItem],
+) -> None:
+    await add_key_value_redis(
+        _cache_key(integration_type, org_id, user_id),
+        json.dumps([vars(item) for item in items], default=str),
+        expire=settings.ITEM_CACHE_TTL,
+    )
+
+
+async def _wait_for_prefetch_slot(promoted: asyncio.Event) -> bool:
+    """Waits for a background slot, or until a user request waits on the crawl.
+
+    Returns whether a slot was taken and must be released.
+    """
+    slot = asyncio.create_task(_prefetch_slots.acquire())
+    promotion = asyncio.create_task(promoted.wait())
+    await asyncio.wait({slot, promotion}, return_when=asyncio.FIRST_COMPLETED)
+    promotion.cancel()
+    if not slot.done():
+        slot.cancel()
+        return False
+    return True
+
+
+async def _crawl(
+    integration_processor: type[IntegrationProcessor],
+    integration_type: IntegrationTypeEnum,
+    credentials: str,
+    org_id: str,
+    user_id: str,
+    promoted: asyncio.Event,
+    background: bool,
+) -> list[IntegrationItem]:
+    """Crawls a tenant's inventory and caches it.
+
+    Processors raise on upstream errors, so failed or partial crawls are
+    never cached.
+    """
+    holds_slot = False
+    if not promoted.is_set():
+        holds_slot = await _wait_for_prefetch_slot(promoted)
+    try:
+        async with asyncio.timeout(settings.PREFETCH_TIMEOUT if background else None):
+            items = await integration_processor.get_items(credentials)
+    finally:
+        if holds_slot:
+            _prefetch_slots.release()
+
+    await set_cached_items(integration_type, org_id, user_id, items)
+    return items
+
+
+def _start_crawl(
+    integration_processor: type[IntegrationProcessor],
+    integration_type: IntegrationTypeEnum,
+    credentials: str,
+    org_id: str,
+    user_id: str,
+    background: bool,
+) -> _InFlightLoad:
+    key = _cache_key(integration_type, org_id, user_id)
+    promoted = asyncio.Event()
+    if not background:
+        promoted.set()
+
+    task = asyncio.create_task(
+        _crawl(
+            integration_processor,
+            integration_type,
+            credentials,
+            org_id,
+            user_id,
+            promoted,
+            background,
+        )
+    )
+    in_flight = _InFlightLoad(task, promoted)
+    _in_flight[key] = in_flight
+
+    def _done(task: asyncio.Task) -> None:
+        if _in_flight.get(key) is in_flight:
+            del _in_flight[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(
+                "%s crawl failed: %r", integration_type.value, task.exception()
+            )
+
+    task.add_done_callback(_done)
+    return in_flight
+
+
+def schedule_prefetch(
+    integration_processor: type[IntegrationProcessor],
+    integration_type: IntegrationTypeEnum,
+    credentials: str,
+    org_id: str,
+    user_id: str,
+) -> None:
+    """Warms the item cache in the background right after the token exchange."""
+    if _cache_key(integration_type, org_id, user_id) in _in_flight:
+        return
+
+    _start_crawl(
+        integration_processor,
+        integration_type,
+        credentials,
+        org_id,
+        user_id,
+        background=True,
+    )
+
+
+async def get_or_load_items(
+    integration_processor: type[IntegrationProcessor],
+    integration_type: IntegrationTypeEnum,
+    credentials: str,
+    org_id: str | None = None,
+    user_id: str | None = None,
+    item_filter: ItemFilter | None = None,
+    refresh: bool = False,
+) -> list[IntegrationItem]:
+    """Serves a tenant's items from the cache, a crawl in flight, or a new crawl.
+
+    A request that finds a warm-up still queued promotes it to run at once.
+    A crawl started by the request itself is cancelled along with it.
+    Requests without a tenant always crawl directly. Filtered requests are
+    answered from a cached inventory when there is one, and otherwise run
+    their own filtered crawl, which is not cached. With `refresh` the cached
+    inventory is skipped and replaced by the result of a new crawl.
+    """
+    if item_filter is not None and not item_filter.is_empty():
+        if org_id is not None and user_id is not None and not refresh:
+            cached = await get_cached_items(integration_type, org_id, user_id)
+            if cached is not None:
+                return [item for item in cached if item_filter.matches(item)]
+        return await integration_processor.get_items(credentials, item_filter)
+
+    if org_id is None or user_id is None:
+        return await integration_processor.get_items(credentials)
+
+    if not refresh:
+        cached = await get_cached_items(integration_type, org_id, user_id)
+        if cached is not None:
+            return cached
+
+    in_flight = _in_flight.get(_cache_key(integration_type, org_id, user_id))
+    if in_flight is not None:
+        in_flight.promoted.set()
+        try:
+            # Shielded so a cancelled request does not cancel the shared crawl.
+            return await asyncio.shield(in_flight.task)
+        except asyncio.CancelledError:
+            if not in_flight.task.cancelled():
+                raise
+        except Exception:
+            pass
+
+    in_flight = _start_crawl(
+        integration_processor,
+        integration_type,
+        credentials,
+        org_id,
+        user_id,
+        background=False,
+    )
+    return await in_flight.task
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import re
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from contextvars import ContextVar
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from core.config import settings
+from database.enum import IntegrationTypeEnum
+from utils.metrics import LOOP_BLOCK_SECONDS, LOOP_BLOCKED, LOOP_LAG_SECONDS
+
+
+logger = logging.getLogger(__name__)
+
+_provider_pattern = re.compile(r"^/integrations/([^/]+)/")
+_providers = {
+    integration_type.value.lower(): integration_type.value
+    for integration_type in IntegrationTypeEnum
+}
+
+# (route, provider) of the request a task is working for.
+_request_scope: ContextVar[tuple[str, str] | None] = ContextVar(
+    "request_scope", default=None
+)
+
+
+class Stall:
+    """A stretch of time during which the event loop did not run its tasks."""
+
+    def __init__(self, route: str | None, provider: str | None, stack: str):
+        self.route = route
+        self.provider = provider
+        self.stack = stack
+        self.duration: float | None = None
+
+
+class LoopMonitor:
+    """Measures event loop lag and reports callbacks that block the loop.
+
+    A ticker task records how late each of its wake-ups is. A watchdog
+    thread notices when the ticker stops beating for longer than the
+    threshold and snapshots the loop thread's stack, attributed to the
+    route and provider of the task that was running.
+    """
+
+    def __init__(self, interval: float, threshold: float, max_stalls: int = 100):
+        self.interval = interval
+        self.threshold = threshold
+        # Most recent stalls, e.g. for benchmarks to assert on.
+        self.stalls: deque[Stall] = deque(maxlen=max_stalls)
+
+        self._attribution: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._heartbeat = time.monotonic()
+        self._current_stall: Stall | None = None
+        self._stall_heartbeat = 0.0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._previous_task_factory = None
+        self._ticker: asyncio.Task | None = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._previous_task_factory = self._loop.get_task_factory()
+        self._loop.set_task_factory(self._task_factory)
+
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._ticker = asyncio.create_task(self._tick())
+        threading.Thread(target=self._watch, name="loop-monitor", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._ticker is not None:
+            self._ticker.cancel()
+            self._ticker = None
+        if self._loop is not None:
+            self._loop.set_task_factory(self._previous_task_factory)
+            self._loop = None
+
+    def attribute(self, task: asyncio.Task, route: str, provider: str) -> None:
+        self._attribution[task] = (route, provider)
+
+    def forget(self, task: asyncio.Task) -> None:
+        self._attribution.pop(task, None)
+
+    def _task_factory(self, loop, coro, context=None):
+        """Lets tasks spawned while serving a request inherit its attribution."""
+        kwargs = {} if context is None else {"context": context}
+        if self._previous_task_factory is not None:
+            task = self._previous_task_factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+
+        if context is not None:
+            scope = context.get(_request_scope)
+        else:
+            scope = _request_scope.get()
+        if scope is not None:
+            self._attribution[task] = scope
+        return task
+
+    async def _tick(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            LOOP_LAG_SECONDS.observe(max(now - expected, 0.0))
+            self._heartbeat = now
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            if time.monotonic() - heartbeat > self.interval + self.threshold:
+                if self._current_stall is None:
+                    self._stall_heartbeat = heartbeat
+                    self._current_stall = self._snapshot()
+            elif self._current_stall is not None:
+                self._finish_stall(heartbeat)
+
+    def _snapshot(self) -> Stall:
+        """Runs on the watchdog thread while the loop thread is stuck."""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+
+        route = provider = None
+        task = asyncio.current_task(self._loop) if self._loop is not None else None
+        if task is not None:
+            route, provider = self._attribution.get(task, (None, None))
+
+        stall = Stall(route, provider, stack)
+        LOOP_BLOCKED.labels(provider or "none").inc()
+        logger.warning(
+            "Event loop blocked for over %.3fs (route=%s, provider=%s):\n%s",
+            self.threshold,
+            route,
+            provider,
+            stack,
+        )
+        return stall
+
+    def _finish_stall(self, heartbeat: float) -> None:
+        stall = self._current_stall
+        stall.duration = max(heartbeat - self._stall_heartbeat - self.interval, 0.0)
+        LOOP_BLOCK_SECONDS.labels(stall.provider or "none").observe(stall.duration)
+        self.stalls.append(stall)
+        self._current_stall = None
+
+
+loop_monitor = LoopMonitor(
+    interval=settings.LOOP_MONITOR_INTERVAL,
+    threshold=settings.LOOP_MONITOR_THRESHOLD,
+)
+
+
+def _attribution(scope: Scope) -> tuple[str, str]:
+    """Route template and provider of a request.
+
+    Both come from fixed sets rather than the raw path, so they stay bounded
+    when used as metric labels.
+    """
+    route = "none"
+    for candidate in scope["app"].routes:
+        path = getattr(candidate, "path", None)
+        if path is not None and candidate.matches(scope)[0] == Match.FULL:
+            route = path
+            break
+
+    provider_match = _provider_pattern.match(route)
+    provider = "none"
+    if provider_match is not None:
+        provider = _providers.get(provider_match.group(1), "none")
+    return route, provider
+
+
+class LoopMonitorMiddleware:
+    """Tags the request's task, and the tasks it spawns, with its route and provider."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route, provider = _attribution(scope)
+        token = _request_scope.set((route, provider))
+        task = asyncio.current_task()
+        loop_monitor.attribute(task, route, provider)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            loop_monitor.forget(task)
+            _request_scope.reset(token)
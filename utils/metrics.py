@@ -0,0 +1,48 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+
+CANCELLED_LOADS = Counter(
+    "integration_loads_cancelled_total",
+    "Loads cancelled before completion, by reason (disconnect or deadline).",
+    ["provider", "reason"],
+)
+CANCELLED_BUDGET_SECONDS = Counter(
+    "integration_cancelled_budget_seconds_total",
+    "Request budget left unspent because a load was cancelled early.",
+    ["provider", "reason"],
+)
+
+ADMISSION_ACTIVE = Gauge(
+    "integration_admission_active",
+    "Loads currently admitted.",
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "integration_admission_queue_depth",
+    "Loads waiting for admission.",
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "integration_admission_wait_seconds",
+    "Time loads spent waiting for admission.",
+    buckets=(0, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+ADMISSION_REJECTED = Counter(
+    "integration_admission_rejected_total",
+    "Loads shed with a 429 because the admission queue was full.",
+)
+
+LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop monitor's periodic wake-ups ran.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+LOOP_BLOCKED = Counter(
+    "event_loop_blocked_total",
+    "Times a callback blocked the event loop for longer than the threshold.",
+    ["provider"],
+)
+LOOP_BLOCK_SECONDS = Histogram(
+    "event_loop_block_seconds",
+    "Duration of event loop stalls longer than the threshold.",
+    ["provider"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
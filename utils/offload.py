@@ -0,0 +1,43 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from core.config import OffloadMode, settings
+
+
+T = TypeVar("T")
+
+_executor: Executor | None = None
+
+
+def _get_executor() -> Executor | None:
+    global _executor
+    if _executor is None and settings.OFFLOAD_MODE == OffloadMode.process:
+        _executor = ProcessPoolExecutor(max_workers=settings.OFFLOAD_MAX_WORKERS)
+    elif _executor is None and settings.OFFLOAD_MODE == OffloadMode.thread:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.OFFLOAD_MAX_WORKERS, thread_name_prefix="offload"
+        )
+    return _executor
+
+
+async def run_decoder(decoder: Callable[..., T], content: bytes, *args) -> T:
+    """Decodes and maps a raw response body off the event loop when it is large.
+
+    `decoder` must be a module level function so it can be sent to a process
+    pool. The raw bytes are handed over as-is; small bodies are decoded inline
+    because the executor round trip would cost more than the work itself.
+    """
+    executor = _get_executor()
+    if executor is None or len(content) < settings.OFFLOAD_THRESHOLD_BYTES:
+        return decoder(content, *args)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, decoder, content, *args)
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,114 @@
+import random
+import re
+import secrets
+import time
+from pathlib import Path
+from uuid import uuid4
+
+from fastapi import Request
+from pyinstrument import Profiler
+from pyinstrument.renderers import SpeedscopeRenderer
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.config import EnvFlavour, settings
+
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+_profile_id_pattern = re.compile(r"^[0-9a-f]{32}$")
+
+
+def is_profiling_authorized(request: Request) -> bool:
+    """Profiling is open outside prod, and token-gated in prod."""
+    if settings.FLAVOUR != EnvFlavour.prod:
+        return True
+
+    token = request.headers.get(PROFILE_TOKEN_HEADER)
+    return bool(
+        settings.PROFILING_TOKEN
+        and token
+        and secrets.compare_digest(token, settings.PROFILING_TOKEN)
+    )
+
+
+def _should_profile(request: Request) -> bool:
+    if not is_profiling_authorized(request):
+        return False
+
+    if request.headers.get(PROFILE_HEADER, "").lower() in ("1", "true", "yes"):
+        return True
+
+    return random.random() < settings.PROFILING_SAMPLE_RATE
+
+
+def get_profile_path(profile_id: str) -> Path | None:
+    """Returns the stored speedscope profile for an id, if there is one."""
+    if not _profile_id_pattern.match(profile_id):
+        return None
+
+    path = Path(settings.PROFILING_OUTPUT_DIR) / f"{profile_id}.speedscope.json"
+    return path if path.is_file() else None
+
+
+def _prune_profiles(output_dir: Path) -> None:
+    """Keeps at most `PROFILING_MAX_FILES` profiles, none older than
+    `PROFILING_MAX_AGE` seconds."""
+    profiles = []
+    for path in output_dir.glob("*.speedscope.json"):
+        try:
+            profiles.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            continue
+    profiles.sort(reverse=True)
+
+    oldest_kept = time.time() - settings.PROFILING_MAX_AGE
+    for index, (modified_at, path) in enumerate(profiles):
+        if index >= settings.PROFILING_MAX_FILES or modified_at < oldest_kept:
+            path.unlink(missing_ok=True)
+
+
+def _store_profile(profile_id: str, profiler: Profiler) -> None:
+    output_dir = Path(settings.PROFILING_OUTPUT_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / f"{profile_id}.speedscope.json").write_text(
+        profiler.output(renderer=SpeedscopeRenderer())
+    )
+    _prune_profiles(output_dir)
+
+
+class ProfilingMiddleware:
+    """Samples a statistical profile of opted-in requests.
+
+    Implemented as plain ASGI middleware so the endpoint, response encoding
+    and body streaming all run inside the profiled task. Time spent awaiting
+    upstream calls is attributed to the awaiting frame. The profile id is
+    returned in `X-Profile-Id` and the speedscope output can be fetched
+    from `/profiles/{profile_id}`.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not _should_profile(Request(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid4().hex
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(PROFILE_ID_HEADER, profile_id)
+            await send(message)
+
+        profiler = Profiler(interval=settings.PROFILING_INTERVAL, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            await run_in_threadpool(_store_profile, profile_id, profiler)
@@ -0,0 +1,222 @@
+import hashlib
+import json
+
+from fastapi import HTTPException, Response
+
+from core.config import settings
+from database.enum import IntegrationTypeEnum
+from redis_client import (
+    add_key_value_redis,
+    expire_key_redis,
+    get_value_redis,
+    tenant_key,
+)
+from schemas.integration_item import IntegrationItem
+
+
+def item_hash(item: IntegrationItem) -> str:
+    """Content hash of a single item."""
+    encoded = json.dumps(vars(item), sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class Snapshot:
+    """Merkle tree over the `parent_id` hierarchy of a tenant's items.
+
+    Each node hash covers the item itself and the node hashes of its
+    children, so an unchanged node hash means the whole subtree is
+    unchanged. Items whose parent is not part of the snapshot are roots.
+    """
+
+    def __init__(self, items: list[IntegrationItem]):
+        self.items: dict[str, IntegrationItem] = {str(item.id): item for item in items}
+        self.item_hashes: dict[str, str] = {
+            item_id: item_hash(item) for item_id, item in self.items.items()
+        }
+        self.children: dict[str, list[str]] = {}
+        self.roots: list[str] = []
+        for item_id, item in self.items.items():
+            parent_id = None if item.parent_id is None else str(item.parent_id)
+            if parent_id in self.items and parent_id != item_id:
+                self.children.setdefault(parent_id, []).append(item_id)
+            else:
+                self.roots.append(item_id)
+
+        self.node_hashes: dict[str, str] = {}
+        for item_id in self.items:
+            self._node_hash(item_id, set())
+
+        self.root_hash = _combine(sorted(self.node_hashes[i] for i in self.roots))
+
+    def _node_hash(self, item_id: str, visiting: set[str]) -> str:
+        if item_id in self.node_hashes:
+            return self.node_hashes[item_id]
+
+        visiting.add(item_id)
+        # Children already on the current path form a parent_id cycle and
+        # are left out rather than recursed into.
+        child_hashes = sorted(
+            self._node_hash(child_id, visiting)
+            for child_id in self.children.get(item_id, [])
+            if child_id not in visiting
+        )
+        visiting.discard(item_id)
+
+        node_hash = _combine([self.item_hashes[item_id], *child_hashes])
+        self.node_hashes[item_id] = node_hash
+        return node_hash
+
+    def dump(self) -> str:
+        return json.dumps(
+            {"item_hashes": self.item_hashes, "node_hashes": self.node_hashes}
+        )
+
+
+def _combine(hashes: list[str]) -> str:
+    return hashlib.sha256("".join(hashes).encode("utf-8")).hexdigest()
+
+
+def _snapshot_key(
+    integration_type: IntegrationTypeEnum, root_hash: str, org_id: str, user_id: str
+) -> str:
+    namespace = f"{integration_type.value.lower()}_snapshot:{root_hash}"
+    return tenant_key(namespace, org_id, user_id)
+
+
+def _load_dump(dump: str) -> tuple[dict[str, str], dict[str, str] | None]:
+    """Item and node hashes of a stored snapshot.
+
+    Snapshots stored before node hashes were kept only have item hashes.
+    """
+    stored = json.loads(dump)
+    if "item_hashes" not in stored:
+        return stored, None
+    return stored["item_hashes"], stored["node_hashes"]
+
+
+def _parse_subtree_hashes(subtree_hashes: str) -> dict[str, str]:
+    try:
+        parsed = json.loads(subtree_hashes)
+    except ValueError:
+        parsed = None
+    if not isinstance(parsed, dict) or not all(
+        isinstance(value, str) for value in parsed.values()
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail="subtree_hashes must be a JSON object of item ids to hashes.",
+        )
+    return parsed
+
+
+def _diff_against_item_hashes(
+    snapshot: Snapshot, previous_item_hashes: dict[str, str]
+) -> tuple[list[str], list[str], list[str]]:
+    added, changed = [], []
+    for item_id, current_hash in snapshot.item_hashes.items():
+        previous_hash = previous_item_hashes.get(item_id)
+        if previous_hash is None:
+            added.append(item_id)
+        elif previous_hash != current_hash:
+            changed.append(item_id)
+
+    removed = [i for i in previous_item_hashes if i not in snapshot.items]
+    return added, changed, removed
+
+
+def _diff_against_subtree_hashes(
+    snapshot: Snapshot, subtree_hashes: dict[str, str]
+) -> tuple[list[str], list[str], list[str]]:
+    """Walks the tree top-down, pruning subtrees whose hash the client has."""
+    added, changed = [], []
+    pending = list(snapshot.roots)
+    while pending:
+        item_id = pending.pop()
+        if subtree_hashes.get(item_id) == snapshot.node_hashes[item_id]:
+            continue
+
+        (changed if item_id in subtree_hashes else added).append(item_id)
+        pending.extend(snapshot.children.get(item_id, []))
+
+    removed = [i for i in subtree_hashes if i not in snapshot.items]
+    return added, changed, removed
+
+
+async def snapshot_delta(
+    integration_type: IntegrationTypeEnum,
+    items: list[IntegrationItem],
+    response: Response,
+    org_id: str | None = None,
+    user_id: str | None = None,
+    root_hash: str | None = None,
+    subtree_hashes: str | None = None,
+) -> Response | dict:
+    """Returns only the items that changed since the client's snapshot.
+
+    The client identifies its snapshot by the root hash it received in the
+    `ETag` header, or by the per-subtree hashes of a previous delta. When
+    neither can be matched, e.g. because the stored snapshot expired, every
+    item is returned as added with `full` set, and the client must replace
+    its items rather than merge them. The current snapshot is stored per
+    tenant so the next request can diff against it.
+    """
+    snapshot = Snapshot(items)
+    response.headers["ETag"] = snapshot.root_hash
+
+    has_tenant = org_id is not None and user_id is not None
+    if root_hash == snapshot.root_hash:
+        if has_tenant:
+            # Keep the base snapshot alive for as long as the client polls it.
+            await expire_key_redis(
+                _snapshot_key(integration_type, root_hash, org_id, user_id),
+                settings.SNAPSHOT_TTL,
+            )
+        return Response(status_code=304, headers={"ETag": snapshot.root_hash})
+
+    if has_tenant:
+        await add_key_value_redis(
+            _snapshot_key(integration_type, snapshot.root_hash, org_id, user_id),
+            snapshot.dump(),
+            expire=settings.SNAPSHOT_TTL,
+        )
+
+    previous = None
+    if has_tenant and root_hash:
+        previous = await get_value_redis(
+            _snapshot_key(integration_type, root_hash, org_id, user_id)
+        )
+
+    full = False
+    if previous:
+        previous_item_hashes, previous_node_hashes = _load_dump(previous)
+        added, changed, removed = _diff_against_item_hashes(
+            snapshot, previous_item_hashes
+        )
+        # Ancestors of added, changed and removed items have new node hashes
+        # too, even where the items themselves are unchanged.
+        previous_node_hashes = previous_node_hashes or {}
+        changed_nodes = [
+            i
+            for i, node_hash in snapshot.node_hashes.items()
+            if previous_node_hashes.get(i) != node_hash
+        ]
+    elif subtree_hashes:
+        # Every node whose hash differs from the client's is walked into, and
+        # so reported as added or changed.
+        added, changed, removed = _diff_against_subtree_hashes(
+            snapshot, _parse_subtree_hashes(subtree_hashes)
+        )
+        changed_nodes = added + changed
+    else:
+        full = True
+        added, changed, removed = list(snapshot.items), [], []
+        changed_nodes = added
+
+    return {
+        "root_hash": snapshot.root_hash,
+        "full": full,
+        "added": [snapshot.items[i] for i in added],
+        "changed": [snapshot.items[i] for i in changed],
+        "removed": removed,
+        "subtree_hashes": {i: snapshot.node_hashes[i] for i in changed_nodes},
+    }